@@ -1,5 +1,10 @@
+import bisect
+import collections
+import hashlib
+import heapq
 import html
 import inspect
+import itertools
 import json
 import os
 import pathlib
@@ -51,10 +56,24 @@ TT_JAVA_CLASS_USAGE = "java_class_usage"
 OUTPUT_PANEL_NAME = "pep"
 OUTPUT_PANEL_NAME_PREFIXED = f"output.{OUTPUT_PANEL_NAME}"
 
+# Number of seconds between Find Usages output panel updates.
+FIND_USAGES_FLUSH_INTERVAL = 0.1
+
+# Number of milliseconds to wait for the user to stop typing before searching symbols.
+SEARCH_SYMBOLS_DELAY = 150
+
 HIGHLIGHTED_REGIONS_KEY = "pg_pep_highligths"
+
 HIGHLIGHTED_STATUS_KEY = "pg_pep_highligths"
 
-# Setting used to override the clj-kondo config for a view analysis.
+BREADCRUMB_STATUS_KEY = "pg_pep_breadcrumb"
+
+USAGE_COUNTS_REGIONS_KEY = "pg_pep_usage_counts"
+
+# Number of seconds between checks of the visible region of the active view - Sublime has no scroll event.
+VIEWPORT_POLL_INTERVAL = 0.25
+
+# Setting used to override the clj-kondo config, or analysis profile, for a view analysis.
 SETTING_CLJ_KONDO_CONFIG = "pep_clj_kondo_config"
 
 # Setting used to toggle a view's annotations.
@@ -62,6 +81,7 @@ SETTING_ANNOTATE_VIEW = "pep_annotate_view"
 
 # Configuration shared by paths and view analysis - without a common configuration the index would be inconsistent.
 CLJ_KONDO_VIEW_PATHS_ANALYSIS_CONFIG = "{:var-definitions true, :var-usages true, :arglists true, :locals true, :keywords true, :symbols true, :java-class-definitions false, :java-class-usages true, :java-member-definitions false, :instance-invocations true}"
+CLJ_KONDO_VIEW_DEFINITIONS_ANALYSIS_CONFIG = "{:var-definitions true, :var-usages false, :arglists true, :locals false, :keywords false, :symbols false, :java-class-definitions false, :java-class-usages false, :java-member-definitions false, :instance-invocations false}"
 CLJ_KONDO_CLASSPATH_ANALYSIS_CONFIG = "{:var-usages false :var-definitions {:shallow true} :arglists true :keywords true :java-class-definitions false}"
 
 CLJ_KONDO_OUTPUT_JSON_CONFIG = "{:format :json :canonical-paths true}"
@@ -70,6 +90,29 @@ CLJ_KONDO_OUTPUT_JSON_CONFIG = "{:format :json :canonical-paths true}"
 CLJ_KONDO_VIEW_CONFIG = f"{{:analysis {CLJ_KONDO_VIEW_PATHS_ANALYSIS_CONFIG} :output {CLJ_KONDO_OUTPUT_JSON_CONFIG} }}"
 CLJ_KONDO_PATHS_CONFIG = f"{{:skip-lint true :analysis {CLJ_KONDO_VIEW_PATHS_ANALYSIS_CONFIG} :output {CLJ_KONDO_OUTPUT_JSON_CONFIG} }}"
 CLJ_KONDO_CLASSPATH_CONFIG = f"{{:skip-lint true :analysis {CLJ_KONDO_CLASSPATH_ANALYSIS_CONFIG} :output {CLJ_KONDO_OUTPUT_JSON_CONFIG} }}"
+CLJ_KONDO_LINT_CONFIG = f"{{:output {CLJ_KONDO_OUTPUT_JSON_CONFIG} }}"
+CLJ_KONDO_VIEW_DEFINITIONS_CONFIG = f"{{:analysis {CLJ_KONDO_VIEW_DEFINITIONS_ANALYSIS_CONFIG} :output {CLJ_KONDO_OUTPUT_JSON_CONFIG} }}"
+
+# clj-kondo exits with 2 if there are warnings, and 3 if there are errors; any other non-zero code is a failure.
+CLJ_KONDO_LINT_EXIT_CODES = {0, 2, 3}
+
+# Maximum length of the --lint argument when linting files - files are linted in batches,
+# so the command line doesn't exceed the limit on Windows (8191 characters for cmd.exe).
+LINT_FILES_MAX_LENGTH = 7000
+
+# Analysis profiles of a view - see `analysis_profile`.
+ANALYSIS_PROFILE_FULL = "full"
+ANALYSIS_PROFILE_DEFINITIONS = "definitions"
+ANALYSIS_PROFILE_FINDINGS = "findings"
+
+ANALYSIS_PROFILE_CONFIG = {
+    ANALYSIS_PROFILE_FULL: CLJ_KONDO_VIEW_CONFIG,
+    ANALYSIS_PROFILE_DEFINITIONS: CLJ_KONDO_VIEW_DEFINITIONS_CONFIG,
+    ANALYSIS_PROFILE_FINDINGS: CLJ_KONDO_LINT_CONFIG,
+}
+
+# Extensions of files linted by clj-kondo.
+CLJ_KONDO_LINT_EXTENSIONS = {".clj", ".cljs", ".cljc", ".bb"}
 
 
 ## -- Analysis Functions
@@ -85,6 +128,8 @@ def af_annotate(context, analysis):
         if annotate_view_after_analysis(view.window()):
             annotate_view(view)
 
+            poll_viewport_async(view)
+
 
 def af_annotate_on_save(context, analysis):
     """
@@ -96,6 +141,31 @@ def af_annotate_on_save(context, analysis):
         if annotate_view_on_save(view.window()):
             annotate_view(view)
 
+            poll_viewport_async(view)
+
+
+def af_analyze_dependents(context, analysis):
+    """
+    Analysis Function to analyze namespaces which require the namespace in view - e.g. on save.
+
+    Depends on setting to analyze dependents on save.
+    """
+    if view := context["view"]:
+        if analyze_dependents_on_save(view.window()):
+            analyze_dependents(view, analysis)
+
+
+def af_annotate_usage_counts(context, analysis):
+    """
+    Analysis Function to annotate Var definitions with their usage count.
+
+    Depends on setting to annotate usage counts.
+    """
+    if view := context["view"]:
+        annotate_usage_counts(view)
+
+        poll_viewport_async(view)
+
 
 def af_highlight_thingy(context, analysis):
     """
@@ -119,6 +189,100 @@ DEFAULT_VIEW_ANALYSIS_FUNCTIONS = [
     af_annotate,
     af_highlight_thingy,
     af_status_summary,
+    af_annotate_usage_counts,
+]
+
+
+## -- Index Functions
+
+
+def pif_symbol_search(project_path, index):
+    """
+    Project Index Function to keep the paths symbol search index in sync.
+    """
+    update_paths_symbol_search_index(project_path, index)
+
+
+def caf_symbol_search(project_path, analysis):
+    """
+    Classpath Analysis Function to build the classpath symbol search index.
+    """
+    set_classpath_symbol_search_index(project_path, analysis)
+
+
+def pif_completion(project_path, index):
+    """
+    Project Index Function to keep the paths completion indexes in sync.
+    """
+    update_paths_completion_index(project_path, index)
+
+
+def pif_call_graph(project_path, index):
+    """
+    Project Index Function to keep the call graph in sync.
+    """
+    update_call_graph(project_path, index)
+
+
+def pif_namespace_graph(project_path, index):
+    """
+    Project Index Function to keep the namespace graph in sync.
+    """
+    update_namespace_graph(project_path, index)
+
+
+def pif_usage_count(project_path, index):
+    """
+    Project Index Function to keep the usage count index in sync.
+    """
+    update_usage_count_index(project_path, index)
+
+
+def caf_completion(project_path, analysis):
+    """
+    Classpath Analysis Function to build the classpath completion indexes.
+    """
+    set_classpath_completion_index(project_path, analysis)
+
+
+def pif_doc_search(project_path, index):
+    """
+    Project Index Function to keep the paths doc search index in sync.
+    """
+    update_paths_doc_search_index(project_path, index)
+
+
+def caf_doc_search(project_path, analysis):
+    """
+    Classpath Analysis Function to build the classpath doc search index.
+    """
+    set_classpath_doc_search_index(project_path, analysis)
+
+
+def pif_definition_index(project_path, index):
+    """
+    Project Index Function to keep the definition index in sync.
+    """
+    update_definition_index(project_path, index)
+
+
+# Functions to run after the project index is updated.
+# (Functions are called with the project path and the index of updated files only.)
+PROJECT_INDEX_FUNCTIONS = [
+    pif_symbol_search,
+    pif_doc_search,
+    pif_completion,
+    pif_call_graph,
+    pif_namespace_graph,
+    pif_usage_count,
+    pif_definition_index,
+]
+
+# Functions to run after the classpath analysis is set.
+CLASSPATH_ANALYSIS_FUNCTIONS = [
+    caf_symbol_search,
+    caf_doc_search,
+    caf_completion,
 ]
 
 
@@ -130,6 +294,19 @@ _view_analysis_ = {}
 
 _classpath_analysis_ = {}
 
+# A new version is assigned to a project index, or classpath analysis, whenever it's updated.
+# Data derived from an index or analysis is cached by version.
+_versions_ = itertools.count(1)
+
+# Mapping of project path to its index version.
+_index_version_ = {}
+
+# Mapping of project path to its classpath analysis version.
+_classpath_analysis_version_ = {}
+
+# Mapping of project path to a tuple of index version and paths analysis.
+_paths_analysis_ = {}
+
 
 def project_index(project_path, not_found={}):
     """
@@ -138,17 +315,50 @@ def project_index(project_path, not_found={}):
     return _index_.get(project_path, not_found) if project_path else not_found
 
 
+def project_index_version(project_path) -> int:
+    """
+    Returns the version of the project index - it changes whenever the index is updated.
+    """
+    return _index_version_.get(project_path, 0)
+
+
 def update_project_index(project_path, index):
     project_index_ = project_index(project_path)
 
     global _index_
     _index_[project_path] = {**project_index_, **index}
 
+    _index_version_[project_path] = next(_versions_)
+
+    for f in PROJECT_INDEX_FUNCTIONS:
+        f(project_path, index)
+
 
 def clear_project_index(project_path):
     global _index_
     _index_.pop(project_path, None)
 
+    _index_version_[project_path] = next(_versions_)
+
+    _paths_analysis_.pop(project_path, None)
+
+    _symbol_search_index_.pop((project_path, "paths"), None)
+
+    _doc_search_index_.pop((project_path, "paths"), None)
+
+    _completion_index_.pop((project_path, "paths", "var"), None)
+    _completion_index_.pop((project_path, "paths", "keyword"), None)
+    _definition_index_.pop(project_path, None)
+
+    for k in [k for k in _goto_file_lists_ if k[0] == project_path]:
+        _goto_file_lists_.pop(k, None)
+
+    _call_graph_.pop(project_path, None)
+
+    _namespace_graph_.pop(project_path, None)
+
+    _usage_count_index_.pop(project_path, None)
+
 
 def clear_cache():
     global _index_
@@ -160,6 +370,56 @@ def clear_cache():
     global _classpath_analysis_
     _classpath_analysis_ = {}
 
+    global _index_version_
+    _index_version_ = {}
+
+    global _classpath_analysis_version_
+    _classpath_analysis_version_ = {}
+
+    global _paths_analysis_
+    _paths_analysis_ = {}
+
+    global _goto_lists_
+    _goto_lists_ = {}
+
+    global _goto_file_lists_
+    _goto_file_lists_ = {}
+
+    global _symbol_search_index_
+    _symbol_search_index_ = {}
+
+    global _doc_search_index_
+    _doc_search_index_ = {}
+
+    global _definition_index_
+    _definition_index_ = {}
+
+    global _prefetch_
+    _prefetch_ = {}
+
+    with _doc_minihtml_lock_:
+        _doc_minihtml_.clear()
+
+    global _completion_index_
+    _completion_index_ = {}
+
+    global _call_graph_
+    _call_graph_ = {}
+
+    global _namespace_graph_
+    _namespace_graph_ = {}
+
+    global _usage_count_index_
+    _usage_count_index_ = {}
+
+    global _findings_cache_
+    _findings_cache_ = {}
+
+    global _saved_files_
+    _saved_files_ = {}
+
+    clear_jar_cache()
+
 
 def set_classpath_analysis(project_path, analysis):
     """
@@ -168,6 +428,11 @@ def set_classpath_analysis(project_path, analysis):
     global _classpath_analysis_
     _classpath_analysis_[project_path] = analysis
 
+    _classpath_analysis_version_[project_path] = next(_versions_)
+
+    for f in CLASSPATH_ANALYSIS_FUNCTIONS:
+        f(project_path, analysis)
+
 
 def classpath_analysis(project_path, not_found={}):
     """
@@ -177,6 +442,13 @@ def classpath_analysis(project_path, not_found={}):
     return _classpath_analysis_.get(project_path, not_found)
 
 
+def classpath_analysis_version(project_path) -> int:
+    """
+    Returns the version of the classpath analysis - it changes whenever the analysis is updated.
+    """
+    return _classpath_analysis_version_.get(project_path, 0)
+
+
 def set_view_analysis(view_id, analysis):
     """
     Updates analysis for a particular view.
@@ -199,12 +471,44 @@ def paths_analysis(project_path, not_found={}):
 
     TODO: Comments
     """
+    # Read version before index - in case the index is updated in between.
+    version = project_index_version(project_path)
+
     project_index_ = project_index(project_path, not_found=not_found)
 
     if not project_index_:
         return not_found
 
-    analysis = unify_analysis(project_index_)
+    # Paths analysis is indexed once per project index version.
+    if (cached_analysis := cached_paths_analysis(project_path, version)) is not None:
+        return cached_analysis
+
+    analysis = index_paths_analysis(unify_analysis(project_index_))
+
+    _paths_analysis_[project_path] = (version, analysis)
+
+    return analysis
+
+
+def cached_paths_analysis(project_path, version, not_found=None):
+    """
+    Returns paths analysis only if it's already indexed for version of the project index.
+
+    Unlike `paths_analysis`, it never indexes - use it when it's not okay to wait.
+    """
+    if cached := _paths_analysis_.get(project_path):
+        cached_version, cached_analysis = cached
+
+        if cached_version == version:
+            return cached_analysis
+
+    return not_found
+
+
+def index_paths_analysis(analysis):
+    """
+    Index paths analysis - it can be the analysis of all files, or of a single file.
+    """
 
     keyword_index_ = keyword_index(analysis)
 
@@ -223,6 +527,7 @@ def paths_analysis(project_path, not_found={}):
         analysis,
         vrn=False,
         vrn_usages=False,
+        vspans=False,
     )
 
     java_class_index_ = java_class_index(
@@ -258,15 +563,49 @@ def project_data(window) -> dict:
         return {}
 
 
+# Mapping of Window ID to a snapshot of its effective settings - see `settings_snapshot`.
+_settings_snapshot_ = {}
+
+
+def settings_snapshot(window) -> dict:
+    """
+    Returns a snapshot of Pep settings merged with project's data.
+
+    Snapshot is taken once per window, and it's cleared when Pep settings,
+    or project's data, change - see `clear_settings_snapshot`.
+    """
+    window_id = window.id() if window else None
+
+    if (snapshot := _settings_snapshot_.get(window_id)) is None:
+        snapshot = {
+            **settings().to_dict(),
+            **{k: v for k, v in project_data(window).items() if v is not None},
+        }
+
+        _settings_snapshot_[window_id] = snapshot
+
+    return snapshot
+
+
+def clear_settings_snapshot(window=None):
+    """
+    Clear settings snapshot of window, or of every window if window is None.
+    """
+    if window:
+        _settings_snapshot_.pop(window.id(), None)
+    else:
+        _settings_snapshot_.clear()
+
+
 def setting(window, k, not_found):
     """
     Get setting k from project's data or Pep settings.
 
     Returns not_found if setting k is is not set.
     """
-    v = project_data(window).get(k)
+    v = settings_snapshot(window).get(k)
 
-    return v if v is not None else settings().get(k, not_found)
+    return v if v is not None else not_found
 
 
 def is_debug(window):
@@ -288,6 +627,22 @@ def analysis_delay(window):
     return setting(window, "analysis_delay", 0.6)
 
 
+def analysis_profile_definitions_size(window):
+    return setting(window, "analysis_profile_definitions_size", 1000000)
+
+
+def analysis_profile_findings_size(window):
+    return setting(window, "analysis_profile_findings_size", 5000000)
+
+
+def analysis_delay_min(window):
+    return setting(window, "analysis_delay_min", 0.1)
+
+
+def analysis_delay_max(window):
+    return setting(window, "analysis_delay_max", 2.0)
+
+
 def automatically_highlight(window):
     return setting(window, "automatically_highlight", False)
 
@@ -308,6 +663,54 @@ def analyze_scratch_view(window):
     return setting(window, "analyze_scratch_view", False)
 
 
+def goto_max_items(window):
+    return setting(window, "goto_max_items", 500)
+
+
+def search_symbols_max_items(window):
+    return setting(window, "search_symbols_max_items", 100)
+
+
+def apropos_max_items(window):
+    return setting(window, "apropos_max_items", 50)
+
+
+def prefetch_definitions(window):
+    return setting(window, "prefetch_definitions", True)
+
+
+def show_doc_on_hover(window):
+    return setting(window, "show_doc_on_hover", True)
+
+
+def show_completions(window):
+    return setting(window, "show_completions", True)
+
+
+def call_hierarchy_depth(window):
+    return setting(window, "call_hierarchy_depth", 3)
+
+
+def analyze_dependents_on_save(window):
+    return setting(window, "analyze_dependents_on_save", True)
+
+
+def analyze_dependents_limit(window):
+    return setting(window, "analyze_dependents_limit", 20)
+
+
+def test_namespace_pattern(window):
+    return setting(window, "test_namespace_pattern", r"-test$")
+
+
+def annotate_usage_counts_enabled(window):
+    return setting(window, "annotate_usage_counts", False)
+
+
+def lint_paths_on_analyze(window):
+    return setting(window, "lint_paths_on_analyze", False)
+
+
 # --- View Status Settings
 
 
@@ -331,6 +734,10 @@ def view_status_show_highlighted_suffix(window):
     return setting(window, "view_status_show_highlighted_suffix", "")
 
 
+def view_status_show_breadcrumb(window):
+    return setting(window, "view_status_show_breadcrumb", False)
+
+
 # ---
 
 
@@ -369,115 +776,294 @@ def output_panel(window):
     )
 
 
-# ---
-
+# -- Tasks
 
-def analysis_view_change_count(view):
-    return view_analysis(view.id()).get("view_change_count")
+# Mapping of Window ID to its running Task.
+_tasks_ = {}
 
 
-def analysis_findings(analysis):
-    return analysis.get("findings", {})
+class Task:
+    """
+    A Task is a unit of work which runs off the UI thread.
 
+    A Task is cancelled if the user presses Escape (see `PgPepCancelTaskCommand`),
+    or if another Task is started in the same Window.
 
-def analysis_summary(analysis):
-    return analysis.get("summary", {})
+    A Task started from a view is stale if, by the time it's done,
+    the view was modified, its selection changed, or it's no longer the active view.
+    """
 
+    def __init__(self, window, view=None):
+        self.window = window
+        self.view = view
+        self.view_change_count = view.change_count() if view else None
+        self.view_sel = [(region.a, region.b) for region in view.sel()] if view else []
+        self.cancelled = threading.Event()
 
-def analysis_kindex(analysis):
-    """
-    Returns a dictionary of keywords by (namespace, name).
+    def cancel(self):
+        self.cancelled.set()
 
-    'kindex' stands for 'keyword index'.
-    """
-    return analysis.get("kindex", {})
+    def is_cancelled(self):
+        return self.cancelled.is_set()
 
+    def is_stale(self):
+        if view := self.view:
+            if not view.is_valid():
+                return True
 
-def analysis_sindex(analysis):
-    """
-    Returns a dictionary of symbols by symbol.
+            if active_view := self.window.active_view():
+                if active_view.id() != view.id():
+                    return True
 
-    'sindex' stands for 'symbol index'.
-    """
-    return analysis.get("sindex", {})
+            if view.change_count() != self.view_change_count:
+                return True
 
+            return [(region.a, region.b) for region in view.sel()] != self.view_sel
 
-def analysis_krn(analysis):
-    """
-    Returns a dictionary of keywords by row.
+        return False
 
-    This index can be used to quicky find a keyword by row.
 
-    'krn' stands for 'keyword row name'.
+def run_task(window, f, done, view=None, label=""):
     """
-    return analysis.get("krn", {})
+    Run `f` off the UI thread and call `done` with its result on the UI thread.
 
+    `f` is called with the Task, so it can check `task.is_cancelled()` and give up early.
 
-def analysis_vindex(analysis):
-    """
-    Returns a dictionary of vars by (namespace, name).
+    `done` is not called if the Task was cancelled, failed or is stale.
 
-    'vindex' stands for 'var index'.
+    Returns the Task.
     """
-    return analysis.get("vindex", {})
 
+    window_id = window.id()
 
-def analysis_vindex_usages(analysis):
-    """
-    Returns a dictionary of Var usages by (namespace, name).
+    task = Task(window, view)
 
-    'vindex_usages' stands for 'Var index'.
-    """
-    return analysis.get("vindex_usages", {})
+    if running_task := _tasks_.get(window_id):
+        running_task.cancel()
 
+    _tasks_[window_id] = task
 
-def analysis_vrn(analysis):
-    """
-    Returns a dictionary of Vars by row.
+    progress.start(label)
 
-    This index can be used to quicky find a Var definition by row.
+    def done_(result):
+        if _tasks_.get(window_id) is task:
+            _tasks_.pop(window_id)
 
-    'vrn' stands for 'var row name'.
-    """
-    return analysis.get("vrn", {})
+            progress.stop()
 
+        if task.is_cancelled():
+            return
 
-def analysis_vrn_usages(analysis):
-    """
-    Returns a dictionary of Var usages by row.
+        if task.is_stale():
+            if is_debug(window):
+                print("Pep Debug: Discarded stale task result")
 
-    This index can be used to quicky find a Var usage by row.
+            return
 
-    'vrn' stands for 'var row name'.
-    """
-    return analysis.get("vrn_usages", {})
+        done(result)
 
+    def run_():
+        result = None
 
-def analysis_jindex(analysis):
-    """
-    Returns a dictionary of Java class definitions indexed by name.
+        try:
+            result = f(task)
+        except Exception:
+            task.cancel()
 
-    'jindex' stands for 'java class definition index'.
-    """
-    return analysis.get("jindex", {})
+            print("Pep: Error: Task", traceback.format_exc())
 
+        sublime.set_timeout(lambda: done_(result), 0)
 
-def analysis_jrn_usages(analysis):
-    """
-    Returns a dictionary of Java class usages by row.
+    threading.Thread(target=run_, daemon=True).start()
 
-    This index can be used to quicky find a Java class usage by row.
+    return task
 
-    'jrn' stands for 'java row name'.
-    """
-    return analysis.get("jrn_usages", {})
 
+def task_running(window) -> bool:
+    return bool(window and _tasks_.get(window.id()))
 
-def analysis_jindex_usages(analysis):
+
+def cancel_task(window) -> bool:
     """
-    Returns a dictionary of Java class usages indexed by name - Class name to a set of class usages.
+    Cancel Window's running Task, if there's one.
 
-    'jindex_usages' stands for 'java class usages index'.
+    Returns True if a Task was cancelled.
+    """
+    if task := _tasks_.pop(window.id(), None):
+        task.cancel()
+
+        progress.stop()
+
+        return True
+
+    return False
+
+
+# -- Debounce
+
+# Generations of debounced calls - a call runs only if it's the latest of its key.
+_debounce_generation_ = itertools.count(1)
+
+# Mapping of debounce key to the generation of its latest call.
+_debounce_ = {}
+
+_debounce_lock_ = threading.Lock()
+
+
+def debounce(key, delay, f):
+    """
+    Call f on Sublime's async thread after delay seconds,
+    unless another call is debounced with the same key in the meantime.
+
+    There's no thread per call; a call which is superseded, or cancelled, is a no-op.
+    """
+    with _debounce_lock_:
+        generation = next(_debounce_generation_)
+
+        _debounce_[key] = generation
+
+    def run_():
+        # The key is removed only if it's still this call's -
+        # another call might have been debounced, or this one cancelled, in the meantime.
+        with _debounce_lock_:
+            if _debounce_.get(key) != generation:
+                return
+
+            _debounce_.pop(key, None)
+
+        f()
+
+    sublime.set_timeout_async(run_, int(delay * 1000))
+
+
+def cancel_debounce(key):
+    """
+    Cancel the pending call debounced with key - if any.
+    """
+    with _debounce_lock_:
+        _debounce_.pop(key, None)
+
+
+# ---
+
+
+def analysis_view_change_count(view):
+    return view_analysis(view.id()).get("view_change_count")
+
+
+def analysis_findings(analysis):
+    return analysis.get("findings", {})
+
+
+def analysis_summary(analysis):
+    return analysis.get("summary", {})
+
+
+def analysis_kindex(analysis):
+    """
+    Returns a dictionary of keywords by (namespace, name).
+
+    'kindex' stands for 'keyword index'.
+    """
+    return analysis.get("kindex", {})
+
+
+def analysis_sindex(analysis):
+    """
+    Returns a dictionary of symbols by symbol.
+
+    'sindex' stands for 'symbol index'.
+    """
+    return analysis.get("sindex", {})
+
+
+def analysis_krn(analysis):
+    """
+    Returns a dictionary of keywords by row.
+
+    This index can be used to quicky find a keyword by row.
+
+    'krn' stands for 'keyword row name'.
+    """
+    return analysis.get("krn", {})
+
+
+def analysis_vindex(analysis):
+    """
+    Returns a dictionary of vars by (namespace, name).
+
+    'vindex' stands for 'var index'.
+    """
+    return analysis.get("vindex", {})
+
+
+def analysis_vspans(analysis):
+    """
+    Returns an index of Var definitions by span - see `var_span_index`.
+
+    This index can be used to find the Var definition enclosing a position.
+
+    Example: (defn f [] |) -> f
+    """
+    return analysis.get("vspans", ([], []))
+
+
+def analysis_vindex_usages(analysis):
+    """
+    Returns a dictionary of Var usages by (namespace, name).
+
+    'vindex_usages' stands for 'Var index'.
+    """
+    return analysis.get("vindex_usages", {})
+
+
+def analysis_vrn(analysis):
+    """
+    Returns a dictionary of Vars by row.
+
+    This index can be used to quicky find a Var definition by row.
+
+    'vrn' stands for 'var row name'.
+    """
+    return analysis.get("vrn", {})
+
+
+def analysis_vrn_usages(analysis):
+    """
+    Returns a dictionary of Var usages by row.
+
+    This index can be used to quicky find a Var usage by row.
+
+    'vrn' stands for 'var row name'.
+    """
+    return analysis.get("vrn_usages", {})
+
+
+def analysis_jindex(analysis):
+    """
+    Returns a dictionary of Java class definitions indexed by name.
+
+    'jindex' stands for 'java class definition index'.
+    """
+    return analysis.get("jindex", {})
+
+
+def analysis_jrn_usages(analysis):
+    """
+    Returns a dictionary of Java class usages by row.
+
+    This index can be used to quicky find a Java class usage by row.
+
+    'jrn' stands for 'java row name'.
+    """
+    return analysis.get("jrn_usages", {})
+
+
+def analysis_jindex_usages(analysis):
+    """
+    Returns a dictionary of Java class usages indexed by name - Class name to a set of class usages.
+
+    'jindex_usages' stands for 'java class usages index'.
     """
     return analysis.get("jindex_usages", {})
 
@@ -525,6 +1111,19 @@ def analysis_lrn_usages(analysis):
     return analysis.get("lrn_usages", {})
 
 
+def analysis_lscopes(analysis):
+    """
+    Returns an index of local binding scopes - see `local_scope_index`.
+
+    This index can be used to find the locals visible at a position.
+
+    Example: (let [a 1] (let [b 2] |)) -> a, b
+
+    'lscopes' stands for 'local scopes'.
+    """
+    return analysis.get("lscopes", ([], [], []))
+
+
 def analysis_nindex(analysis):
     """
     Returns a dictionary of namespace definition by name.
@@ -730,19 +1329,94 @@ def namespace_index(
     }
 
 
+def local_scope_index(local_bindings):
+    """
+    Returns an interval index of local binding scopes - a tuple of starts, scopes and parents.
+
+    A local is visible from the end of its binding to the end of its scope.
+    Scopes are sorted by start, and since scopes are lexical - nested or disjoint -
+    the scopes visible at a position are the last scope starting before it and its parents,
+    so a lookup is a bisection plus a walk up the nesting - see `visible_locals`.
+    """
+
+    scopes = []
+
+    for local_binding in local_bindings:
+        if local_binding.get("scope-end-row"):
+            start = (
+                local_binding.get("end-row") or local_binding.get("row"),
+                local_binding.get("end-col") or local_binding.get("col"),
+            )
+
+            end = (
+                local_binding.get("scope-end-row"),
+                local_binding.get("scope-end-col"),
+            )
+
+            scopes.append((start, end, local_binding))
+
+    # Enclosing scopes first if they start at the same position.
+    scopes.sort(key=lambda scope: (scope[0], (-scope[1][0], -scope[1][1])))
+
+    starts = []
+
+    # Index of the enclosing scope, or -1.
+    parents = []
+
+    # Stack of indexes of scopes which might enclose the next scope.
+    stack = []
+
+    for i, (start, end, _) in enumerate(scopes):
+        while stack and scopes[stack[-1]][1] < end:
+            stack.pop()
+
+        parents.append(stack[-1] if stack else -1)
+
+        starts.append(start)
+
+        stack.append(i)
+
+    return (starts, scopes, parents)
+
+
+def visible_locals(analysis, row, col) -> List:
+    """
+    Returns a list of local bindings visible at row and col - innermost first.
+    """
+
+    starts, scopes, parents = analysis_lscopes(analysis)
+
+    position = (row, col)
+
+    i = bisect.bisect_left(starts, position) - 1
+
+    l = []
+
+    while i >= 0:
+        start, end, local_binding = scopes[i]
+
+        if start < position < end:
+            l.append(local_binding)
+
+        i = parents[i]
+
+    return l
+
+
 def local_index(
     analysis,
     lindex=True,
     lindex_usages=True,
     lrn=True,
     lrn_usages=True,
+    lscopes=True,
 ):
     """
     Index local definitions and usages.
 
     Definitions and usages are indexed by id.
 
-    Returns dict with keys 'lindex', 'lindex_usages', 'lrn', 'lrn_usages'.
+    Returns dict with keys 'lindex', 'lindex_usages', 'lrn', 'lrn_usages', 'lscopes'.
     """
 
     # Locals indexed by row.
@@ -751,6 +1425,16 @@ def local_index(
     # Locals indexed by ID.
     lindex_ = {}
 
+    # Locals indexed by scope.
+    lscopes_ = ([], [], [])
+
+    if lscopes:
+        lscopes_ = local_scope_index(
+            {**local_binding, "_semantic": TT_LOCAL}
+            for local_binding in analysis.get("locals", [])
+            if local_binding.get("row") and local_binding.get("col")
+        )
+
     if lindex or lrn:
         for local_binding in analysis.get("locals", []):
             # Ignore data missing row and col - it seems like a clj-kondo bug.
@@ -798,6 +1482,7 @@ def local_index(
         "lindex_usages": lindex_usages_,
         "lrn": lrn_,
         "lrn_usages": lrn_usages_,
+        "lscopes": lscopes_,
     }
 
 
@@ -837,12 +1522,57 @@ def keyword_index(
     }
 
 
+def var_span_index(var_definitions_):
+    """
+    Returns an index of Var definition spans - a tuple of starts and Var definitions sorted by start.
+
+    Var definitions don't nest, so the definition enclosing a position
+    is the last one starting before it, if it ends after it - see `enclosing_var_definition`.
+    """
+
+    spans = sorted(
+        (
+            (
+                (var_definition.get("row"), var_definition.get("col")),
+                var_definition,
+            )
+            for var_definition in var_definitions_
+            if var_definition.get("end-row")
+        ),
+        key=lambda span: span[0],
+    )
+
+    return (
+        [start for start, _ in spans],
+        [var_definition for _, var_definition in spans],
+    )
+
+
+def enclosing_var_definition(analysis, row, col) -> Optional[dict]:
+    """
+    Returns the Var definition enclosing row and col, or None.
+    """
+
+    starts, var_definitions_ = analysis_vspans(analysis)
+
+    i = bisect.bisect_right(starts, (row, col)) - 1
+
+    if i >= 0:
+        var_definition = var_definitions_[i]
+
+        end = (var_definition.get("end-row"), var_definition.get("end-col"))
+
+        if (row, col) <= end:
+            return var_definition
+
+
 def var_index(
     analysis,
     vindex=True,
     vindex_usages=True,
     vrn=True,
     vrn_usages=True,
+    vspans=True,
 ):
     # Vars indexed by row.
     vrn_ = {}
@@ -850,6 +1580,16 @@ def var_index(
     # Vars indexed by namespace and name.
     vindex_ = {}
 
+    # Vars indexed by span - see `var_span_index`.
+    vspans_ = ([], [])
+
+    if vspans:
+        vspans_ = var_span_index(
+            {**var_definition, "_semantic": TT_VAR_DEFINITION}
+            for var_definition in analysis.get("var-definitions", [])
+            if var_definition.get("row") and var_definition.get("col")
+        )
+
     if vindex or vrn:
         for var_definition in analysis.get("var-definitions", []):
             # Ignore data missing row and col - it seems like a clj-kondo bug.
@@ -903,6 +1643,7 @@ def var_index(
         "vrn": vrn_,
         "vindex_usages": vindex_usages_,
         "vrn_usages": vrn_usages_,
+        "vspans": vspans_,
     }
 
 
@@ -1079,24 +1820,96 @@ def htmlify(text):
         return ""
 
 
+# Maximum number of JAR files kept open - see `jar_file`.
+JAR_POOL_SIZE = 8
+
+_jar_lock_ = threading.Lock()
+
+# Mapping of JAR path to a tuple of mtime and ZipFile - least recently used first.
+_jar_pool_ = collections.OrderedDict()
+
+# Mapping of temporary file path to the (JAR path, mtime, entry) extracted to it.
+_jar_extracted_ = {}
+
+
+def jar_file(dep_jar, mtime) -> ZipFile:
+    """
+    Returns an open ZipFile of JAR `dep_jar` from the pool.
+
+    Opening a JAR reads its central directory, which is slow for large JARs,
+    so at most `JAR_POOL_SIZE` JARs are kept open; the least recently used is closed first.
+
+    Must be called with `_jar_lock_` held.
+    """
+
+    if pooled := _jar_pool_.get(dep_jar):
+        pooled_mtime, jar = pooled
+
+        if pooled_mtime == mtime:
+            _jar_pool_.move_to_end(dep_jar)
+
+            return jar
+
+        jar.close()
+
+    jar = ZipFile(dep_jar)
+
+    _jar_pool_[dep_jar] = (mtime, jar)
+    _jar_pool_.move_to_end(dep_jar)
+
+    while len(_jar_pool_) > JAR_POOL_SIZE:
+        _, (_, evicted_jar) = _jar_pool_.popitem(last=False)
+        evicted_jar.close()
+
+    return jar
+
+
+def clear_jar_cache():
+    with _jar_lock_:
+        for _, jar in _jar_pool_.values():
+            jar.close()
+
+        _jar_pool_.clear()
+
+        _jar_extracted_.clear()
+
+
 def open_jar(filename, f):
     """
     Open JAR `filename` and call `f` with the path of the temporary file.
+
+    An entry is extracted once per JAR mtime - repeat visits reuse the temporary file.
     """
 
     dep_jar, dep_filepath = filename.split(":")
 
-    with ZipFile(dep_jar) as jar:
-        with jar.open(dep_filepath) as jar_file:
-            tmp_path = os.path.join(tempfile.gettempdir(), dep_filepath)
+    # Entries are extracted to a directory per JAR, so the same entry of different JARs
+    # - e.g. versions of a library - don't overwrite each other.
+    tmp_path = os.path.join(
+        tempfile.gettempdir(),
+        "pep-" + hashlib.sha1(dep_jar.encode()).hexdigest()[:12],
+        dep_filepath,
+    )
+
+    with _jar_lock_:
+        key = (dep_jar, os.path.getmtime(dep_jar), dep_filepath)
+
+        # The temporary file is reused only if it's the extraction of this JAR's mtime.
+        if _jar_extracted_.get(tmp_path) != key or not os.path.exists(tmp_path):
+            _jar_extracted_.pop(tmp_path, None)
+
+            jar = jar_file(dep_jar, key[1])
 
-            # Create all parent directories of the temporary file:
-            os.makedirs(os.path.dirname(tmp_path), exist_ok=True)
+            with jar.open(dep_filepath) as jar_file_:
+                # Create all parent directories of the temporary file:
+                os.makedirs(os.path.dirname(tmp_path), exist_ok=True)
 
-            with open(tmp_path, "w") as tmp_file:
-                tmp_file.write(jar_file.read().decode())
+                with open(tmp_path, "w") as tmp_file:
+                    tmp_file.write(jar_file_.read().decode())
 
-            f(tmp_path)
+            _jar_extracted_[tmp_path] = key
+
+    f(tmp_path)
 
 
 def goto(window, location, flags=sublime.ENCODED_POSITION):
@@ -1343,28 +2156,1497 @@ def thingy_quick_panel_item(thingy, opts={}) -> Optional[sublime.QuickPanelItem]
         return finding_quick_panel_item(thingy, opts)
 
 
-def goto_thingy(
-    window,
-    thingy_list,
-    goto_on_highlight=False,
-    goto_side_by_side=False,
-    quick_panel_item_opts={
-        "show_namespace": True,
-        "show_filename": True,
-        "show_row_col": False,
-    },
-):
+def goto_anything_list(analysis) -> List:
     """
-    Show a Quick Panel to select a thingy to goto.
-
-    Items is a list of dict with keys "thingy_type", "thingy_data" and "quick_panel_item".
+    Returns a list of namespace definitions, Var definitions and keyword regs sorted by name.
+    """
+    thingy_list = thingy_dedupe(
+        [
+            *namespace_definitions(analysis),
+            *var_definitions(analysis),
+            *keyword_regs(analysis),
+        ],
+    )
+
+    return sorted(thingy_list, key=thingy_name)
+
+
+def goto_namespace_list(analysis) -> List:
+    """
+    Returns a list of namespace definitions sorted by name.
+    """
+    return sorted(thingy_dedupe(namespace_definitions(analysis)), key=thingy_name)
+
+
+def goto_keyword_list(analysis) -> List:
+    """
+    Returns a list of keyword regs sorted by name.
+    """
+    return sorted(thingy_dedupe(keyword_regs(analysis)), key=thingy_name)
+
+
+GOTO_LISTS = {
+    "anything": goto_anything_list,
+    "namespace": goto_namespace_list,
+    "keyword": goto_keyword_list,
+}
+
+GOTO_ANYTHING_QUICK_PANEL_ITEM_OPTS = {
+    "show_namespace": True,
+    "show_row_col": False,
+}
+
+# Mapping of (project path, scope, list name, Quick Panel item options) to
+# a tuple of analysis version, thingy list and QuickPanelItems.
+_goto_lists_ = {}
+
+# Mapping of (project path, scope, list name, Quick Panel item options) to a mapping of
+# filename to a tuple of the file's definitions, thingy list and QuickPanelItems - see `paths_goto_list`.
+_goto_file_lists_ = {}
+
+
+def goto_list(project_path, scope, name, quick_panel_item_opts={}):
+    """
+    Returns a tuple of thingy list and QuickPanelItems,
+    or None if there isn't an analysis for scope.
+
+    Scope is either "paths" or "classpath", and name is a key of GOTO_LISTS.
+
+    Lists are built once per analysis version - see `refresh_goto_lists`.
+    """
+
+    if scope == "paths":
+        return paths_goto_list(project_path, name, quick_panel_item_opts)
+
+    version = classpath_analysis_version(project_path)
+
+    k = (project_path, scope, name, tuple(sorted(quick_panel_item_opts.items())))
+
+    if cached := _goto_lists_.get(k):
+        cached_version, thingy_list, quick_panel_items = cached
+
+        if cached_version == version:
+            return thingy_list, quick_panel_items
+
+    if not (analysis := classpath_analysis(project_path, not_found=None)):
+        return None
+
+    thingy_list = GOTO_LISTS[name](analysis)
+
+    quick_panel_items = [
+        thingy_quick_panel_item(thingy, opts=quick_panel_item_opts)
+        for thingy in thingy_list
+    ]
+
+    _goto_lists_[k] = (version, thingy_list, quick_panel_items)
+
+    return thingy_list, quick_panel_items
+
+
+def paths_goto_list(project_path, name, quick_panel_item_opts={}):
+    """
+    Returns a tuple of thingy list and QuickPanelItems of paths,
+    or None if paths weren't analyzed.
+
+    Lists are built by file, from the definitions of the file - see `DefinitionIndex` -
+    so only lists of files whose definitions changed are built again;
+    the list of paths is a merge of (sorted) file lists, once per definitions version.
+    """
+    if not (definition_index_ := _definition_index_.get(project_path)):
+        return None
+
+    with definition_index_.lock:
+        version = definition_index_.version
+
+        files = dict(definition_index_.files)
+
+    if not files:
+        return None
+
+    k = (project_path, "paths", name, tuple(sorted(quick_panel_item_opts.items())))
+
+    if cached := _goto_lists_.get(k):
+        cached_version, thingy_list, quick_panel_items = cached
+
+        if cached_version == version:
+            return thingy_list, quick_panel_items
+
+    file_lists = _goto_file_lists_.setdefault(k, {})
+
+    # Files removed from the index.
+    for filename in set(file_lists) - set(files):
+        file_lists.pop(filename, None)
+
+    for filename, file_definitions in files.items():
+        # Definitions of a file are replaced, never mutated, if they change.
+        if (cached := file_lists.get(filename)) and cached[0] is file_definitions:
+            continue
+
+        file_thingy_list = GOTO_LISTS[name](file_definitions)
+
+        file_lists[filename] = (
+            file_definitions,
+            file_thingy_list,
+            [
+                thingy_quick_panel_item(thingy, opts=quick_panel_item_opts)
+                for thingy in file_thingy_list
+            ],
+        )
+
+    merged = list(
+        heapq.merge(
+            *[
+                zip(file_thingy_list, file_quick_panel_items)
+                for _, file_thingy_list, file_quick_panel_items in file_lists.values()
+            ],
+            key=lambda merged_item: thingy_name(merged_item[0]),
+        )
+    )
+
+    thingy_list = [thingy for thingy, _ in merged]
+
+    quick_panel_items = [quick_panel_item for _, quick_panel_item in merged]
+
+    _goto_lists_[k] = (version, thingy_list, quick_panel_items)
+
+    return thingy_list, quick_panel_items
+
+
+def refresh_goto_lists(project_path, scope):
+    """
+    Build Goto lists of scope for the current analysis version:
+    the Goto Anything list, and lists which were built before for a previous version.
+
+    It's meant to be called in the background, right after an analysis is completed,
+    so a Goto Quick Panel doesn't have to wait for its list to be built.
+    """
+    goto_list(project_path, scope, "anything", GOTO_ANYTHING_QUICK_PANEL_ITEM_OPTS)
+
+    for k in list(_goto_lists_.keys()):
+        project_path_, scope_, name, quick_panel_item_opts = k
+
+        if project_path_ == project_path and scope_ == scope:
+            goto_list(project_path, scope, name, dict(quick_panel_item_opts))
+
+
+# -- Symbol Search
+
+
+def name_grams(name) -> set:
+    """
+    Returns n-grams of name which are indexed for substring search.
+
+    Trigrams of name prefixed with '^', so there are trigrams to mark the beginning of name,
+    and bigrams to mark the beginning of name and of its name part (after '/') - for queries shorter than 3.
+
+    A keyword's leading colon is not part of its n-grams - queries are stripped of it too.
+    """
+
+    s = "^" + name.lstrip(":")
+
+    grams = {s[i : i + 3] for i in range(len(s) - 2)}
+
+    grams.add(s[:2])
+
+    if (i := s.rfind("/")) != -1 and i + 1 < len(s):
+        grams.add(s[i : i + 2])
+
+    return grams
+
+
+def symbol_search_score(name, query):
+    """
+    Returns a sort key of name for query - lower is better.
+
+    Exact matches rank first, then prefix matches of name part (after '/'),
+    then prefix matches of name, then any other match; shorter names first.
+    """
+
+    name_part = name.rsplit("/", 1)[-1]
+
+    if name_part == query or name == query:
+        rank = 0
+    elif name_part.startswith(query):
+        rank = 1
+    elif name.startswith(query):
+        rank = 2
+    else:
+        rank = 3
+
+    return (rank, len(name), name)
+
+
+class TrigramIndex:
+    """
+    Substring search index of names - names are indexed by their trigrams (n-grams of 3).
+
+    A name matches a query if it has all of the query's trigrams and, to rule out
+    false positives, if it contains the query. Queries shorter than 3 match
+    names, or name parts, starting with the query.
+
+    Entries are added, and replaced, by key - e.g. filename - so the index
+    can be kept in sync with the analysis it was built from.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.next_id = 0
+
+        # Mapping of entry ID to a tuple of name and thingy.
+        self.entries = {}
+
+        # Mapping of key to a list of entry ID.
+        self.keys = {}
+
+        # Mapping of n-gram to a set of entry ID.
+        self.postings = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _remove(self, key):
+        for id_ in self.keys.pop(key, []):
+            name, _ = self.entries.pop(id_)
+
+            for gram in name_grams(name):
+                if postings := self.postings.get(gram):
+                    postings.discard(id_)
+
+                    if not postings:
+                        del self.postings[gram]
+
+    def remove(self, key):
+        with self.lock:
+            self._remove(key)
+
+    def update(self, key, entries):
+        """
+        Replace entries of key - entries is a list of tuple of name and thingy.
+        """
+        with self.lock:
+            self._remove(key)
+
+            ids = []
+
+            for name, thingy in entries:
+                name = name.lower()
+
+                id_ = self.next_id
+                self.next_id += 1
+
+                self.entries[id_] = (name, thingy)
+
+                for gram in name_grams(name):
+                    self.postings.setdefault(gram, set()).add(id_)
+
+                ids.append(id_)
+
+            self.keys[key] = ids
+
+    def search(self, query, limit=100) -> List:
+        """
+        Returns a list of tuple of score and thingy - at most `limit` best matches for query.
+
+        See `symbol_search_score`; a query with a leading colon ranks keywords first.
+        """
+
+        # Keyword query - its leading colon is kept for ranking only.
+        keyword_query = query.lower() if query.startswith(":") else None
+
+        query = query.lower().lstrip(":")
+
+        if not query:
+            return []
+
+        with self.lock:
+            if len(query) >= 3:
+                postings = [
+                    self.postings.get(gram, set())
+                    for gram in {query[i : i + 3] for i in range(len(query) - 2)}
+                ]
+
+                postings.sort(key=len)
+
+                ids = postings[0].intersection(*postings[1:])
+
+                matches = [
+                    self.entries[id_] for id_ in ids if query in self.entries[id_][0]
+                ]
+
+            else:
+                ids = self.postings.get("^" + query, set()) | self.postings.get(
+                    "/" + query, set()
+                )
+
+                matches = [self.entries[id_] for id_ in ids]
+
+        return heapq.nsmallest(
+            limit,
+            (
+                (
+                    symbol_search_score(name, keyword_query)
+                    if keyword_query
+                    else symbol_search_score(name.lstrip(":"), query),
+                    thingy,
+                )
+                for name, thingy in matches
+            ),
+            key=lambda match: match[0],
+        )
+
+
+# Mapping of (project path, scope) to TrigramIndex - scope is either "paths" or "classpath".
+_symbol_search_index_ = {}
+
+
+def symbol_search_entries(analysis) -> List:
+    """
+    Returns a list of tuple of name and thingy of namespace definitions,
+    Var definitions and keyword regs in analysis - an already indexed analysis.
+    """
+    thingy_list = thingy_dedupe(
+        [
+            *namespace_definitions(analysis),
+            *var_definitions(analysis),
+            *keyword_regs(analysis),
+        ]
+    )
+
+    return [(thingy_name(thingy), thingy) for thingy in thingy_list]
+
+
+def symbol_search_index(project_path, scope) -> Optional[TrigramIndex]:
+    return _symbol_search_index_.get((project_path, scope))
+
+
+def update_paths_symbol_search_index(project_path, index):
+    """
+    Update paths symbol search index with index - mapping of filename to analysis.
+    """
+    search_index = _symbol_search_index_.setdefault(
+        (project_path, "paths"), TrigramIndex()
+    )
+
+    for filename, analysis in index.items():
+        search_index.update(
+            filename,
+            symbol_search_entries(
+                {
+                    **namespace_index(
+                        analysis,
+                        nindex_usages=False,
+                        nrn=False,
+                        nrn_usages=False,
+                    ),
+                    **var_index(
+                        analysis,
+                        vindex_usages=False,
+                        vrn=False,
+                        vrn_usages=False,
+                        vspans=False,
+                    ),
+                    **keyword_index(analysis, krn=False),
+                }
+            ),
+        )
+
+
+def set_classpath_symbol_search_index(project_path, analysis):
+    """
+    Build classpath symbol search index from classpath analysis.
+    """
+    search_index = TrigramIndex()
+    search_index.update(None, symbol_search_entries(analysis))
+
+    _symbol_search_index_[(project_path, "classpath")] = search_index
+
+
+def search_symbols(project_path, query, limit=100) -> List:
+    """
+    Returns a list of thingy - at most `limit` best matches for query in paths and classpath.
+    """
+    matches = []
+
+    for scope in ["paths", "classpath"]:
+        if search_index := symbol_search_index(project_path, scope):
+            matches.extend(search_index.search(query, limit))
+
+    return [
+        thingy
+        for _, thingy in heapq.nsmallest(limit, matches, key=lambda match: match[0])
+    ]
+
+
+# -- Doc Search
+
+
+def doc_terms(text) -> set:
+    """
+    Returns the set of terms of text - lowercase words, and parts of hyphenated words.
+
+    Symbol characters are part of a word, so names like `->>` and `some?` are terms too.
+
+    'Returns a lazy-seq' -> {'returns', 'a', 'lazy-seq', 'lazy', 'seq'}
+    """
+
+    terms = set()
+
+    for word in re.findall(r"[\w\-\?\!\*\+<>=']+", text.lower()):
+        # Quotes aren't part of a name - e.g. 'foo' in a docstring.
+        word = word.strip("'")
+
+        if not word:
+            continue
+
+        terms.add(word)
+
+        # Parts without a word character, e.g. '>>' of '->>', aren't terms.
+        if "-" in word:
+            terms.update(part for part in word.split("-") if re.search(r"\w", part))
+
+    return terms
+
+
+def definition_doc_text(definition) -> str:
+    """
+    Returns the text of a Var or namespace definition which is indexed for doc search:
+    qualified name, arglists and doc.
+    """
+    return " ".join(
+        [
+            definition.get("ns", ""),
+            definition.get("name", ""),
+            *definition.get("arglist-strs", []),
+            definition.get("doc") or "",
+        ]
+    )
+
+
+class DocIndex:
+    """
+    Inverted index of definition terms - see `doc_terms` and `definition_doc_text`.
+
+    A definition matches a query if it has all of the query's terms.
+
+    Entries are added, and replaced, by key - e.g. filename - so the index
+    can be kept in sync with the analysis it was built from.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.next_id = 0
+
+        # Mapping of entry ID to definition.
+        self.entries = {}
+
+        # Mapping of key to a list of entry ID.
+        self.keys = {}
+
+        # Mapping of term to a set of entry ID.
+        self.postings = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _remove(self, key):
+        for id_ in self.keys.pop(key, []):
+            definition = self.entries.pop(id_)
+
+            for term in doc_terms(definition_doc_text(definition)):
+                if postings := self.postings.get(term):
+                    postings.discard(id_)
+
+                    if not postings:
+                        del self.postings[term]
+
+    def remove(self, key):
+        with self.lock:
+            self._remove(key)
+
+    def update(self, key, definitions):
+        """
+        Replace definitions of key.
+        """
+        with self.lock:
+            self._remove(key)
+
+            ids = []
+
+            for definition in definitions:
+                id_ = self.next_id
+                self.next_id += 1
+
+                self.entries[id_] = definition
+
+                for term in doc_terms(definition_doc_text(definition)):
+                    self.postings.setdefault(term, set()).add(id_)
+
+                ids.append(id_)
+
+            self.keys[key] = ids
+
+    def search(self, query, limit=50) -> List:
+        """
+        Returns a list of tuple of score and definition - at most `limit` best matches for query.
+
+        Definitions with query terms in their name rank first; shorter docs first.
+        """
+
+        terms = doc_terms(query)
+
+        if not terms:
+            return []
+
+        with self.lock:
+            postings = [self.postings.get(term, set()) for term in terms]
+
+            postings.sort(key=len)
+
+            ids = postings[0].intersection(*postings[1:])
+
+            matches = [self.entries[id_] for id_ in ids]
+
+        def score(definition):
+            name = definition.get("name", "")
+
+            name_terms = doc_terms(name)
+
+            return (
+                -len(terms & name_terms),
+                len(definition.get("doc") or ""),
+                len(name),
+                name,
+            )
+
+        return heapq.nsmallest(
+            limit,
+            ((score(definition), definition) for definition in matches),
+            key=lambda match: match[0],
+        )
+
+
+# Mapping of (project path, scope) to DocIndex - scope is either "paths" or "classpath".
+_doc_search_index_ = {}
+
+
+def doc_search_index(project_path, scope) -> Optional[DocIndex]:
+    return _doc_search_index_.get((project_path, scope))
+
+
+def update_paths_doc_search_index(project_path, index):
+    """
+    Update paths doc search index with index - mapping of filename to analysis.
+    """
+    search_index = _doc_search_index_.setdefault((project_path, "paths"), DocIndex())
+
+    for filename, analysis in index.items():
+        search_index.update(
+            filename,
+            [
+                *analysis.get("namespace-definitions", []),
+                *analysis.get("var-definitions", []),
+            ],
+        )
+
+
+def set_classpath_doc_search_index(project_path, analysis):
+    """
+    Build classpath doc search index from classpath analysis.
+    """
+    search_index = DocIndex()
+    search_index.update(
+        None,
+        thingy_dedupe(
+            [
+                *namespace_definitions(analysis),
+                *var_definitions(analysis),
+            ]
+        ),
+    )
+
+    _doc_search_index_[(project_path, "classpath")] = search_index
+
+
+def search_docs(project_path, query, limit=50) -> List:
+    """
+    Returns a list of Var and namespace definitions - at most `limit` best matches for query in paths and classpath.
+    """
+    matches = []
+
+    for scope in ["paths", "classpath"]:
+        if search_index := doc_search_index(project_path, scope):
+            matches.extend(search_index.search(query, limit))
+
+    return [
+        definition
+        for _, definition in heapq.nsmallest(
+            limit, matches, key=lambda match: match[0]
+        )
+    ]
+
+
+# -- Completions
+
+# Maximum number of completions of each kind - Vars, aliases and keywords.
+COMPLETIONS_MAX_ITEMS = 100
+
+# Characters of a symbol or keyword, which are completed.
+COMPLETION_TOKEN_REGEX = re.compile(r"[\w\-\.\*\+\!\?<>=/:'&$%]+$")
+
+
+class PrefixIndex:
+    """
+    Prefix search index of names.
+
+    Names are kept in a sorted list, so names starting with a prefix are
+    a contiguous range found by bisection - it serves the same lookups
+    as a trie, for a fraction of the memory of a trie of a large classpath.
+
+    Entries are added, and replaced, by key - e.g. filename - so the index
+    can be kept in sync with the analysis it was built from.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.next_id = 0
+
+        # Mapping of entry ID to thingy.
+        self.entries = {}
+
+        # Mapping of key to a list of tuple of name and entry ID.
+        self.keys = {}
+
+        # Sorted list of tuple of name and entry ID.
+        self.names = []
+
+    def __len__(self):
+        return len(self.entries)
+
+    def update(self, key, entries):
+        """
+        Replace entries of key - entries is a list of tuple of name and thingy.
+        """
+        with self.lock:
+            removed = self.keys.pop(key, [])
+
+            for _, id_ in removed:
+                self.entries.pop(id_, None)
+
+            added = []
+
+            for name, thingy in entries:
+                id_ = self.next_id
+                self.next_id += 1
+
+                self.entries[id_] = thingy
+
+                added.append((name, id_))
+
+            self.keys[key] = added
+
+            # Rebuild the list if much of it changes - e.g. when it's built.
+            if len(removed) + len(added) > len(self.names) // 8:
+                removed_ = set(removed)
+
+                self.names = sorted(
+                    [name_id for name_id in self.names if name_id not in removed_]
+                    + added
+                )
+
+            else:
+                for name_id in removed:
+                    i = bisect.bisect_left(self.names, name_id)
+
+                    if i < len(self.names) and self.names[i] == name_id:
+                        del self.names[i]
+
+                for name_id in added:
+                    bisect.insort(self.names, name_id)
+
+    def search(self, prefix, limit=100) -> List:
+        """
+        Returns a list of tuple of name and thingy - at most `limit` names starting with prefix.
+        """
+        matches = []
+
+        with self.lock:
+            i = bisect.bisect_left(self.names, (prefix,))
+
+            while i < len(self.names) and len(matches) < limit:
+                name, id_ = self.names[i]
+
+                if not name.startswith(prefix):
+                    break
+
+                matches.append((name, self.entries[id_]))
+
+                i += 1
+
+        return matches
+
+
+# Mapping of (project path, scope, kind) to PrefixIndex -
+# scope is either "paths" or "classpath", and kind is either "var" or "keyword".
+_completion_index_ = {}
+
+
+def keyword_completion_name(keyword) -> str:
+    ns = keyword.get("ns")
+    name = keyword.get("name")
+
+    return f":{ns}/{name}" if ns else f":{name}"
+
+
+def var_completion_entries(var_definitions_) -> List:
+    """
+    Returns a list of tuple of qualified name and Var definition.
+    """
+    return [
+        (f"{var_definition.get('ns')}/{var_definition.get('name')}", var_definition)
+        for var_definition in var_definitions_
+        if var_definition.get("row") and var_definition.get("col")
+    ]
+
+
+def keyword_completion_entries(keywords) -> List:
+    """
+    Returns a list of tuple of name and keyword - one per keyword name.
+    """
+    entries = {}
+
+    for keyword in keywords:
+        if keyword.get("row") and keyword.get("col"):
+            name = keyword_completion_name(keyword)
+
+            # Prefer keyword registrations, e.g. re-frame handlers and specs.
+            if name not in entries or keyword.get("reg"):
+                entries[name] = keyword
+
+    return list(entries.items())
+
+
+def completion_index(project_path, scope, kind) -> Optional[PrefixIndex]:
+    return _completion_index_.get((project_path, scope, kind))
+
+
+def update_paths_completion_index(project_path, index):
+    """
+    Update paths completion indexes with index - mapping of filename to analysis.
+    """
+    var_index_ = _completion_index_.setdefault(
+        (project_path, "paths", "var"), PrefixIndex()
+    )
+
+    keyword_index_ = _completion_index_.setdefault(
+        (project_path, "paths", "keyword"), PrefixIndex()
+    )
+
+    for filename, analysis in index.items():
+        var_index_.update(
+            filename,
+            var_completion_entries(analysis.get("var-definitions", [])),
+        )
+
+        keyword_index_.update(
+            filename,
+            keyword_completion_entries(analysis.get("keywords", [])),
+        )
+
+
+def set_classpath_completion_index(project_path, analysis):
+    """
+    Build classpath completion indexes from classpath analysis.
+    """
+    var_index_ = PrefixIndex()
+    var_index_.update(None, var_completion_entries(var_definitions(analysis)))
+
+    keywords = []
+
+    for keywords_ in analysis_kindex(analysis).values():
+        keywords.extend(keywords_)
+
+    keyword_index_ = PrefixIndex()
+    keyword_index_.update(None, keyword_completion_entries(keywords))
+
+    _completion_index_[(project_path, "classpath", "var")] = var_index_
+    _completion_index_[(project_path, "classpath", "keyword")] = keyword_index_
+
+
+def search_completion_index(project_path, kind, prefix, limit) -> List:
+    """
+    Returns a list of tuple of name and thingy starting with prefix in paths and classpath.
+    """
+    matches = {}
+
+    for scope in ["paths", "classpath"]:
+        if index := completion_index(project_path, scope, kind):
+            for name, thingy in index.search(prefix, limit):
+                matches.setdefault(name, thingy)
+
+    return sorted(matches.items(), key=lambda match: match[0])[:limit]
+
+
+def var_completion_item(var_definition, trigger, head):
+    """
+    Returns a CompletionItem of a Var definition.
+
+    Sublime Text replaces the word under the cursor - `head` is the part of trigger before the word.
+    """
+    return sublime.CompletionItem(
+        trigger,
+        annotation=" ".join(var_definition.get("arglist-strs", [])),
+        completion=trigger[len(head) :],
+        kind=thingy_kind(TT_VAR_DEFINITION, var_definition),
+        details=var_definition.get("ns", ""),
+    )
+
+
+def completions(view, view_analysis_, project_path_, point, token, prefix) -> List:
+    """
+    Returns a list of CompletionItem for token - the symbol, or keyword, before the cursor (point).
+
+    Unqualified symbols complete to locals in scope - innermost first, to aliases,
+    and to Vars of the current namespace, of clojure.core (or cljs.core) and referred Vars.
+
+    Qualified symbols complete to Vars of the aliased (or named) namespace.
+    """
+
+    # Part of token before the word which is replaced by Sublime Text.
+    head = token[: len(token) - len(prefix)] if token.endswith(prefix) else ""
+
+    items = []
+
+    if token.startswith(":"):
+        for name, keyword in search_completion_index(
+            project_path_, "keyword", token, COMPLETIONS_MAX_ITEMS
+        ):
+            items.append(
+                sublime.CompletionItem(
+                    name,
+                    completion=name[len(head) :],
+                    kind=sublime.KIND_KEYWORD,
+                    details=keyword.get("reg", ""),
+                )
+            )
+
+        return items
+
+    namespace_usages_ = namespace_usages(view_analysis_)
+
+    if "/" in token:
+        alias, name = token.split("/", 1)
+
+        ns = alias
+
+        for namespace_usage in namespace_usages_:
+            if namespace_usage.get("alias") == alias:
+                ns = namespace_usage.get("to")
+                break
+
+        for _, var_definition in search_completion_index(
+            project_path_, "var", f"{ns}/{name}", COMPLETIONS_MAX_ITEMS
+        ):
+            trigger = f"{alias}/{var_definition.get('name')}"
+
+            items.append(var_completion_item(var_definition, trigger, head))
+
+        return items
+
+    # Locals in scope.
+    # (Analysis is most likely stale while typing, but edits are usually
+    # at the cursor, so scopes before it are still where they were.)
+    row, col = view.rowcol(point)
+
+    locals_seen = set()
+
+    for local_binding in visible_locals(view_analysis_, row + 1, col + 1):
+        name = local_binding.get("name", "")
+
+        # Inner locals shadow outer locals of the same name.
+        if name.startswith(token) and name not in locals_seen:
+            locals_seen.add(name)
+
+            items.append(
+                sublime.CompletionItem(
+                    name,
+                    annotation="local",
+                    completion=name[len(head) :],
+                    kind=thingy_kind(TT_LOCAL_BINDING, local_binding),
+                )
+            )
+
+    # Aliases
+    for namespace_usage in namespace_usages_:
+        if (alias := namespace_usage.get("alias")) and alias.startswith(token):
+            items.append(
+                sublime.CompletionItem(
+                    alias,
+                    annotation=namespace_usage.get("to", ""),
+                    completion=alias[len(head) :],
+                    kind=thingy_kind(TT_NAMESPACE_USAGE_ALIAS, namespace_usage),
+                )
+            )
+
+    # Vars of the current namespace - view analysis is the most recent.
+    namespaces = {
+        namespace_definition.get("name")
+        for namespace_definition in namespace_definitions(view_analysis_)
+    }
+
+    seen = set()
+
+    for var_definition in var_definitions(view_analysis_):
+        if (name := var_definition.get("name", "")).startswith(token):
+            seen.add((var_definition.get("ns"), name))
+
+            items.append(var_completion_item(var_definition, name, head))
+
+    # Vars of clojure.core, or cljs.core, and Vars of the current namespace in paths.
+    extension = file_extension(view.file_name()) or ".clj"
+
+    if extension in {".clj", ".cljc", ".bb"}:
+        namespaces.add("clojure.core")
+
+    if extension in {".cljs", ".cljc"}:
+        namespaces.add("cljs.core")
+
+    for ns in namespaces:
+        for _, var_definition in search_completion_index(
+            project_path_, "var", f"{ns}/{token}", COMPLETIONS_MAX_ITEMS
+        ):
+            name = var_definition.get("name")
+
+            if (ns, name) not in seen:
+                seen.add((ns, name))
+
+                items.append(var_completion_item(var_definition, name, head))
+
+    # Referred Vars
+    for var_usage in var_usages(view_analysis_):
+        if var_usage.get("refer") and (name := var_usage.get("name", "")).startswith(
+            token
+        ):
+            ns = var_usage.get("to")
+
+            if (ns, name) not in seen:
+                seen.add((ns, name))
+
+                for _, var_definition in search_completion_index(
+                    project_path_, "var", f"{ns}/{name}", 1
+                ):
+                    items.append(var_completion_item(var_definition, name, head))
+
+    return items
+
+
+# -- Call Graph
+
+
+class CallGraph:
+    """
+    Call graph of Vars - built from Var usages inside Var definitions.
+
+    A Var is a tuple of namespace and name. Each edge, from caller to callee,
+    keeps its usages by filename - so edges are added, and replaced, by file
+    and the graph can be kept in sync with the project index.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+
+        # Mapping of filename to a list of tuple of caller and callee.
+        self.files = {}
+
+        # Mapping of caller to callee to filename to usages.
+        self.outgoing = {}
+
+        # Mapping of callee to caller to filename to usages.
+        self.incoming = {}
+
+    def _remove_edge(self, adjacency, a, b, filename):
+        if (edges := adjacency.get(a)) and (usages_by_file := edges.get(b)):
+            usages_by_file.pop(filename, None)
+
+            if not usages_by_file:
+                del edges[b]
+
+                if not edges:
+                    del adjacency[a]
+
+    def update(self, filename, var_usages_):
+        """
+        Replace edges of filename with edges of Var usages.
+        """
+        with self.lock:
+            for caller, callee in self.files.pop(filename, []):
+                self._remove_edge(self.outgoing, caller, callee, filename)
+                self._remove_edge(self.incoming, callee, caller, filename)
+
+            edges = set()
+
+            for var_usage in var_usages_:
+                if not (from_var := var_usage.get("from-var")):
+                    continue
+
+                if not (var_usage.get("row") and var_usage.get("col")):
+                    continue
+
+                caller = (var_usage.get("from"), from_var)
+                callee = (var_usage.get("to"), var_usage.get("name"))
+
+                var_usage = {**var_usage, "_semantic": TT_VAR_USAGE}
+
+                self.outgoing.setdefault(caller, {}).setdefault(
+                    callee, {}
+                ).setdefault(filename, []).append(var_usage)
+
+                self.incoming.setdefault(callee, {}).setdefault(
+                    caller, {}
+                ).setdefault(filename, []).append(var_usage)
+
+                edges.add((caller, callee))
+
+            self.files[filename] = list(edges)
+
+    def adjacent(self, var, direction) -> dict:
+        """
+        Returns a mapping of callers, or callees, of Var to their usages.
+
+        Direction is either "callers" or "callees".
+        """
+        adjacency = self.incoming if direction == "callers" else self.outgoing
+
+        with self.lock:
+            return {
+                var_: [
+                    usage for usages in usages_by_file.values() for usage in usages
+                ]
+                for var_, usages_by_file in adjacency.get(var, {}).items()
+            }
+
+    def hierarchy(self, var, direction, depth) -> List:
+        """
+        Returns a list of tuple of level, Var and usages - callers, or callees, of Var up to depth levels.
+
+        Vars are listed depth-first, and a Var's callers, or callees, are listed only once.
+        """
+
+        visited = {var}
+
+        l = []
+
+        def walk(var_, level):
+            if level > depth:
+                return
+
+            for adjacent_var, usages in sorted(
+                self.adjacent(var_, direction).items(),
+                key=lambda item: (str(item[0][0]), str(item[0][1])),
+            ):
+                l.append((level, adjacent_var, usages))
+
+                if adjacent_var not in visited:
+                    visited.add(adjacent_var)
+
+                    walk(adjacent_var, level + 1)
+
+        walk(var, 1)
+
+        return l
+
+
+# Mapping of project path to CallGraph.
+_call_graph_ = {}
+
+
+def call_graph(project_path) -> Optional[CallGraph]:
+    return _call_graph_.get(project_path)
+
+
+def update_call_graph(project_path, index):
+    """
+    Update call graph with index - mapping of filename to analysis.
+    """
+    graph = _call_graph_.setdefault(project_path, CallGraph())
+
+    for filename, analysis in index.items():
+        graph.update(filename, analysis.get("var-usages", []))
+
+
+# -- Namespace Graph
+
+
+class NamespaceGraph:
+    """
+    Dependency graph of namespaces - built from namespace usages, e.g. requires.
+
+    Edges, from a namespace to a namespace it requires, are added,
+    and replaced, by file - so the graph can be kept in sync with the project index.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = 0
+
+        # Mapping of filename to a set of edges - tuple of namespace and required namespace.
+        self.files = {}
+
+        # Mapping of edge to the number of files it's in.
+        self.edges = {}
+
+        # Mapping of namespace to a set of namespaces it requires.
+        self.requires = {}
+
+        # Mapping of namespace to a set of namespaces requiring it.
+        self.required_by = {}
+
+        # Mapping of namespace to a set of filenames requiring it.
+        self.required_by_files = {}
+
+        # Tuple of version and topological order.
+        self.topological_order_ = (None, [])
+
+    def update(self, filename, namespace_usages_):
+        """
+        Replace edges of filename with edges of namespace usages.
+        """
+        with self.lock:
+            for edge in self.files.pop(filename, set()):
+                if filenames := self.required_by_files.get(edge[1]):
+                    filenames.discard(filename)
+
+                    if not filenames:
+                        del self.required_by_files[edge[1]]
+
+                self.edges[edge] -= 1
+
+                if not self.edges[edge]:
+                    del self.edges[edge]
+
+                    from_, to = edge
+
+                    self.requires[from_].discard(to)
+                    self.required_by[to].discard(from_)
+
+                    if not self.requires[from_]:
+                        del self.requires[from_]
+
+                    if not self.required_by[to]:
+                        del self.required_by[to]
+
+            edges = {
+                (namespace_usage.get("from"), namespace_usage.get("to"))
+                for namespace_usage in namespace_usages_
+                if namespace_usage.get("from") and namespace_usage.get("to")
+            }
+
+            for edge in edges:
+                self.edges[edge] = self.edges.get(edge, 0) + 1
+
+                from_, to = edge
+
+                self.requires.setdefault(from_, set()).add(to)
+                self.required_by.setdefault(to, set()).add(from_)
+                self.required_by_files.setdefault(to, set()).add(filename)
+
+            self.files[filename] = edges
+
+            self.version += 1
+
+    def dependent_files(self, namespace) -> set:
+        """
+        Returns a set of filenames which require namespace - directly.
+        """
+        with self.lock:
+            return set(self.required_by_files.get(namespace, ()))
+
+    def closure(self, namespaces, direction) -> dict:
+        """
+        Returns a mapping of namespace to distance - namespaces which namespaces require, transitively,
+        if direction is "dependencies", or namespaces which require namespaces, transitively, if it's "dependents".
+        """
+        adjacency = self.requires if direction == "dependencies" else self.required_by
+
+        namespaces = set(namespaces)
+
+        distances = {}
+
+        with self.lock:
+            frontier = list(namespaces)
+
+            distance = 0
+
+            while frontier:
+                distance += 1
+
+                next_frontier = []
+
+                for namespace_ in frontier:
+                    for adjacent in adjacency.get(namespace_, ()):
+                        if adjacent not in namespaces and adjacent not in distances:
+                            distances[adjacent] = distance
+                            next_frontier.append(adjacent)
+
+                frontier = next_frontier
+
+        return distances
+
+    def topological_order(self) -> List:
+        """
+        Returns a list of namespaces - namespaces come after the namespaces they require.
+
+        Namespaces in a cycle come last. The order is cached until the graph changes.
+        """
+        with self.lock:
+            version, order = self.topological_order_
+
+            if version == self.version:
+                return order
+
+            namespaces = set(self.requires) | set(self.required_by)
+
+            in_degree = {
+                namespace: len(self.requires.get(namespace, ()))
+                for namespace in namespaces
+            }
+
+            ready = sorted(
+                namespace for namespace, degree in in_degree.items() if not degree
+            )
+
+            order = []
+
+            while ready:
+                namespace = ready.pop()
+
+                order.append(namespace)
+
+                for dependent in self.required_by.get(namespace, ()):
+                    in_degree[dependent] -= 1
+
+                    if not in_degree[dependent]:
+                        ready.append(dependent)
+
+            # Cycles
+            ordered = set(order)
+
+            order.extend(sorted(namespaces - ordered))
+
+            self.topological_order_ = (self.version, order)
+
+            return order
+
+
+# Mapping of project path to NamespaceGraph.
+_namespace_graph_ = {}
+
+
+def namespace_graph(project_path) -> Optional[NamespaceGraph]:
+    return _namespace_graph_.get(project_path)
+
+
+def update_namespace_graph(project_path, index):
+    """
+    Update namespace graph with index - mapping of filename to analysis.
+    """
+    graph = _namespace_graph_.setdefault(project_path, NamespaceGraph())
+
+    for filename, analysis in index.items():
+        graph.update(filename, analysis.get("namespace-usages", []))
+
+
+# -- Usage Counts
+
+
+class UsageCountIndex:
+    """
+    Count of usages of Vars - Var usages, except recursive ones, and symbol usages, e.g. `'app.core/f`.
+
+    Counts, and public Var definitions, are added, and replaced, by file -
+    so the index can be kept in sync with the project index.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = 0
+
+        # Mapping of filename to a mapping of Var - tuple of namespace and name - to count.
+        self.files = {}
+
+        # Mapping of Var to count.
+        self.counts = {}
+
+        # Mapping of filename to a list of public Var definitions.
+        self.definitions = {}
+
+    def update(self, filename, analysis):
+        """
+        Replace counts, and definitions, of filename with the ones in analysis - raw clj-kondo analysis of the file.
+        """
+        file_counts = {}
+
+        for var_usage in analysis.get("var-usages", []):
+            if not recursive_usage(var_usage):
+                k = (var_usage.get("to"), var_usage.get("name"))
+
+                file_counts[k] = file_counts.get(k, 0) + 1
+
+        for sym in analysis.get("symbols", []):
+            if namespace := symbol_namespace(sym):
+                k = (namespace, symbol_name(sym))
+
+                file_counts[k] = file_counts.get(k, 0) + 1
+
+        definitions = [
+            {**var_definition, "_semantic": TT_VAR_DEFINITION}
+            for var_definition in analysis.get("var-definitions", [])
+            if not var_definition.get("private")
+            and var_definition.get("row")
+            and var_definition.get("col")
+        ]
+
+        with self.lock:
+            for k, count in self.files.pop(filename, {}).items():
+                self.counts[k] -= count
+
+                if not self.counts[k]:
+                    del self.counts[k]
+
+            for k, count in file_counts.items():
+                self.counts[k] = self.counts.get(k, 0) + count
+
+            self.files[filename] = file_counts
+
+            self.definitions[filename] = definitions
+
+            self.version += 1
+
+    def count(self, namespace, name) -> int:
+        return self.counts.get((namespace, name), 0)
+
+    def unused(self) -> List:
+        """
+        Returns a list of public Var definitions without usages - sorted by filename and row.
+
+        Entry points - `-main` and tests - are not included.
+        """
+        with self.lock:
+            return sorted(
+                (
+                    var_definition
+                    for definitions in self.definitions.values()
+                    for var_definition in definitions
+                    if not self.counts.get(
+                        (var_definition.get("ns"), var_definition.get("name"))
+                    )
+                    and var_definition.get("name") != "-main"
+                    and not var_definition.get("test")
+                    and not str(var_definition.get("defined-by")).endswith("/deftest")
+                ),
+                key=lambda var_definition: (
+                    var_definition.get("filename"),
+                    var_definition.get("row"),
+                ),
+            )
+
+
+# Mapping of project path to UsageCountIndex.
+_usage_count_index_ = {}
+
+
+def usage_count_index(project_path) -> Optional[UsageCountIndex]:
+    return _usage_count_index_.get(project_path)
+
+
+def update_usage_count_index(project_path, index):
+    """
+    Update usage count index with index - mapping of filename to analysis.
+    """
+    usage_count_index_ = _usage_count_index_.setdefault(
+        project_path, UsageCountIndex()
+    )
+
+    for filename, analysis in index.items():
+        usage_count_index_.update(filename, analysis)
+
+
+# -- Affected Tests
+
+# Mapping of project path to a set of (canonical) filenames saved since affected tests were last computed.
+_saved_files_ = {}
+
+
+def affected_test_namespaces(project_path, filenames, pattern=r"-test$") -> List:
+    """
+    Returns a sorted list of test namespaces affected by changes to filenames -
+    namespaces defined in filenames, and namespaces which require them transitively,
+    whose name matches pattern.
+    """
+
+    project_index_ = project_index(project_path)
+
+    namespaces = {
+        namespace_definition.get("name")
+        for filename in filenames
+        for namespace_definition in project_index_.get(filename, {}).get(
+            "namespace-definitions", []
+        )
+    }
+
+    affected = set(namespaces)
+
+    if graph := namespace_graph(project_path):
+        affected.update(graph.closure(namespaces, "dependents"))
+
+    return sorted(namespace for namespace in affected if re.search(pattern, namespace))
+
+
+# Mapping of Window ID to the thingy list, and goto options, to narrow by file.
+_goto_narrow_ = {}
+
+
+def goto_thingy(
+    window,
+    thingy_list,
+    goto_on_highlight=False,
+    goto_side_by_side=False,
+    quick_panel_item_opts={
+        "show_namespace": True,
+        "show_filename": True,
+        "show_row_col": False,
+    },
+    group_by_file=False,
+    quick_panel_items=None,
+):
+    """
+    Show a Quick Panel to select a thingy to goto.
+
+    Items is a list of dict with keys "thingy_type", "thingy_data" and "quick_panel_item".
+
+    `quick_panel_items` are the (prebuilt) QuickPanelItems of thingy list - see `goto_list`.
+
+    The Quick Panel shows at most `goto_max_items` items at a time;
+    if there are more, it ends with items to load more or to narrow by file.
+
+    If `group_by_file` is True, files are shown first - see `PgPepGotoNarrowCommand`.
     """
 
-    # Restore active view, its selection, and viewport position - if there's an active view.
-
     if not thingy_list:
         return
 
+    if group_by_file:
+        goto_thingy_narrow(
+            window,
+            thingy_list,
+            goto_on_highlight=goto_on_highlight,
+            goto_side_by_side=goto_side_by_side,
+            quick_panel_item_opts=quick_panel_item_opts,
+        )
+
+        return
+
+    # Restore active view, its selection, and viewport position - if there's an active view.
+
     initial_view = window.active_view()
 
     initial_regions = [region for region in initial_view.sel()] if initial_view else []
@@ -1373,99 +3655,419 @@ def goto_thingy(
         initial_view.viewport_position() if initial_view else None
     )
 
-    def location(index):
-        return thingy_location(thingy_list[index])
+    def restore():
+        if initial_view:
+            initial_view.sel().clear()
 
-    def on_highlight(index):
-        goto(
-            window,
-            location(index),
-            flags=GOTO_TRANSIENT_FLAGS,
+            for region in initial_regions:
+                initial_view.sel().add(region)
+
+            window.focus_view(initial_view)
+
+            initial_view.set_viewport_position(initial_viewport_position, True)
+
+    page_size = goto_max_items(window)
+
+    def show(limit, selected_index=-1):
+        page = thingy_list[:limit]
+
+        def location(index):
+            return thingy_location(page[index])
+
+        def on_highlight(index):
+            if index < len(page):
+                goto(
+                    window,
+                    location(index),
+                    flags=GOTO_TRANSIENT_FLAGS,
+                )
+
+        def on_select(index):
+            if index == -1:
+                restore()
+
+            elif index < len(page):
+                goto(
+                    window,
+                    location(index),
+                    GOTO_SIDE_BY_SIDE_FLAGS if goto_side_by_side else GOTO_DEFAULT_FLAGS,
+                )
+
+            # Load more.
+            # (Show the next Quick Panel once this one is closed.)
+            elif index == len(page):
+                sublime.set_timeout(
+                    lambda: show(limit + page_size, selected_index=len(page)), 0
+                )
+
+            # Narrow by file.
+            else:
+                restore()
+
+                sublime.set_timeout(
+                    lambda: goto_thingy_narrow(
+                        window,
+                        thingy_list,
+                        goto_on_highlight=goto_on_highlight,
+                        goto_side_by_side=goto_side_by_side,
+                        quick_panel_item_opts=quick_panel_item_opts,
+                    ),
+                    0,
+                )
+
+        page_quick_panel_items = (
+            quick_panel_items[:limit]
+            if quick_panel_items is not None
+            else [
+                thingy_quick_panel_item(
+                    thingy,
+                    opts=quick_panel_item_opts,
+                )
+                for thingy in page
+            ]
+        )
+
+        if len(thingy_list) > len(page):
+            page_quick_panel_items.extend(
+                [
+                    sublime.QuickPanelItem(
+                        "Load more...",
+                        annotation=f"{len(page):,} of {len(thingy_list):,}",
+                    ),
+                    sublime.QuickPanelItem("Narrow by file..."),
+                ]
+            )
+
+        window.show_quick_panel(
+            page_quick_panel_items,
+            on_select,
+            selected_index=selected_index,
+            on_highlight=on_highlight if goto_on_highlight else None,
         )
 
-    def on_select(index):
-        if index == -1:
-            if initial_view:
-                initial_view.sel().clear()
+    show(page_size)
+
+
+def goto_thingy_narrow(
+    window,
+    thingy_list,
+    goto_on_highlight=False,
+    goto_side_by_side=False,
+    quick_panel_item_opts={},
+):
+    """
+    Show files of thingy list, with the number of thingies in each file,
+    to select the file to narrow the list to.
+    """
+
+    _goto_narrow_[window.id()] = {
+        "thingy_list": thingy_list,
+        "goto_on_highlight": goto_on_highlight,
+        "goto_side_by_side": goto_side_by_side,
+        "quick_panel_item_opts": quick_panel_item_opts,
+    }
+
+    window.run_command(
+        "show_overlay",
+        {
+            "overlay": "command_palette",
+            "command": "pg_pep_goto_narrow",
+        },
+    )
+
+
+# -- Definition Index
+
+
+class DefinitionIndex:
+    """
+    Var, namespace and keyword definitions of paths, indexed like an analysis -
+    'vindex', 'nindex' and 'kindex' - so it can be used with `find_definitions`.
+
+    Definitions are added, and replaced, by file - so the index can be kept in sync
+    with the project index without indexing paths analysis again.
+    Its version changes only if the definitions of a file change.
+    (Versions are unique across indexes - see `_versions_`.)
+    """
+
+    KEYS = ("vindex", "nindex", "kindex")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = 0
+
+        # Mapping of filename to its definitions - a mapping of index key to index.
+        self.files = {}
+
+        self.analysis = {k: {} for k in DefinitionIndex.KEYS}
+
+    def update(self, filename, analysis):
+        """
+        Replace definitions of filename with the ones in analysis - raw clj-kondo analysis of the file.
+        """
+        file_definitions = {
+            "vindex": var_index(
+                analysis,
+                vindex_usages=False,
+                vrn=False,
+                vrn_usages=False,
+                vspans=False,
+            )["vindex"],
+            "nindex": namespace_index(
+                analysis,
+                nindex_usages=False,
+                nrn=False,
+                nrn_usages=False,
+            )["nindex"],
+            # Only keywords with definition semantics - see `find_keyword_definitions`.
+            "kindex": keyword_index(
+                {
+                    "keywords": [
+                        keyword
+                        for keyword in analysis.get("keywords", [])
+                        if keyword.get("reg")
+                    ]
+                },
+                krn=False,
+            )["kindex"],
+        }
+
+        with self.lock:
+            previous_definitions = self.files.get(filename, {})
+
+            if previous_definitions == file_definitions:
+                return
+
+            for k in DefinitionIndex.KEYS:
+                index = self.analysis[k]
 
-                for region in initial_regions:
-                    initial_view.sel().add(region)
+                for name, definitions in previous_definitions.get(k, {}).items():
+                    previous = {id(definition) for definition in definitions}
 
-                window.focus_view(initial_view)
+                    if remaining := [
+                        definition
+                        for definition in index.get(name, [])
+                        if id(definition) not in previous
+                    ]:
+                        index[name] = remaining
+                    else:
+                        index.pop(name, None)
 
-                initial_view.set_viewport_position(initial_viewport_position, True)
+                # Lists are replaced, never mutated, so readers don't need the lock.
+                for name, definitions in file_definitions[k].items():
+                    index[name] = index.get(name, []) + definitions
+
+            self.files[filename] = file_definitions
+
+            self.version = next(_versions_)
+
+
+# Mapping of project path to DefinitionIndex.
+_definition_index_ = {}
+
+
+def update_definition_index(project_path, index):
+    """
+    Update definition index with index - mapping of filename to analysis.
+    """
+    definition_index_ = _definition_index_.setdefault(project_path, DefinitionIndex())
+
+    for filename, analysis in index.items():
+        definition_index_.update(filename, analysis)
+
+
+def paths_definitions(project_path) -> dict:
+    """
+    Returns definitions of paths indexed like an analysis - see `DefinitionIndex`.
+
+    Unlike `paths_analysis`, it's never indexed on demand, so it's okay to call it anytime.
+    """
+    if definition_index_ := _definition_index_.get(project_path):
+        return definition_index_.analysis
+
+    return {}
+
+
+def paths_definitions_version(project_path) -> int:
+    if definition_index_ := _definition_index_.get(project_path):
+        return definition_index_.version
+
+    return 0
+
+
+## ---
+
+
+def set_view_name(view, name):
+    if view:
+        if view.is_loading():
+            sublime.set_timeout(lambda: set_view_name(view, name), 100)
         else:
-            goto(
-                window,
-                location(index),
-                GOTO_SIDE_BY_SIDE_FLAGS if goto_side_by_side else GOTO_DEFAULT_FLAGS,
-            )
+            view.set_name(name)
 
-    quick_panel_items = [
-        thingy_quick_panel_item(
-            thingy,
-            opts=quick_panel_item_opts,
+
+def view_text(view, region=None):
+    if region:
+        return view.substr(region)
+    else:
+        return view.substr(sublime.Region(0, view.size()))
+
+
+def project_classpath(window):
+    """
+    Returns the project classpath, or None if a classpath setting does not exist.
+
+    It reads a custom "pep classpath" setting in the project file.
+
+    Example.sublime-project:
+
+    {
+        ...
+
+        "pep": {
+            "classpath": ["clojure", "-Spath"]
+        }
+    }
+    """
+    if classpath := project_data_classpath(window):
+        classpath = classpath if isinstance(classpath, list) else shlex.split(classpath)
+
+        classpath_completed_process = subprocess.run(
+            classpath,
+            cwd=project_path(window),
+            text=True,
+            capture_output=True,
         )
-        for thingy in thingy_list
-    ]
 
-    window.show_quick_panel(
-        quick_panel_items,
-        on_select,
-        on_highlight=on_highlight if goto_on_highlight else None,
+        classpath_completed_process.check_returncode()
+
+        return classpath_completed_process.stdout
+
+
+## ---
+
+
+# -- Analysis Delay
+
+# Delay is (at least) this many times the expected latency of view's analysis.
+ANALYSIS_DELAY_LATENCY_FACTOR = 2
+
+# Weight of the latest latency in the moving average of view's analysis latency.
+ANALYSIS_LATENCY_WEIGHT = 0.3
+
+# Number of seconds of continuous typing which doubles the delay.
+ANALYSIS_DELAY_BACKOFF_PERIOD = 5
+
+# Mapping of View ID to the moving average of its analysis latency (seconds), and buffer size.
+_analysis_latency_ = {}
+
+
+def record_analysis_latency(view_id, seconds, size):
+    if latency := _analysis_latency_.get(view_id):
+        seconds = seconds * ANALYSIS_LATENCY_WEIGHT + latency["seconds"] * (
+            1 - ANALYSIS_LATENCY_WEIGHT
+        )
+
+        size = size * ANALYSIS_LATENCY_WEIGHT + latency["size"] * (
+            1 - ANALYSIS_LATENCY_WEIGHT
+        )
+
+    _analysis_latency_[view_id] = {
+        "seconds": seconds,
+        "size": size,
+    }
+
+
+def estimate_analysis_delay(
+    delay,
+    delay_min,
+    delay_max,
+    latency=None,
+    size=0,
+    typing_seconds=0,
+):
+    """
+    Returns the number of seconds to delay an analysis, within delay_min and delay_max.
+
+    delay is used until there's a latency - moving average of seconds and size.
+    Expected latency is scaled by the buffer's growth since it was measured,
+    and the delay is backed off, up to twice as much, while typing continuously.
+    """
+    if latency:
+        expected_latency = latency["seconds"] * max(1.0, size / max(latency["size"], 1))
+
+        delay = expected_latency * ANALYSIS_DELAY_LATENCY_FACTOR
+
+    delay = delay * (1 + min(typing_seconds / ANALYSIS_DELAY_BACKOFF_PERIOD, 1))
+
+    return min(max(delay, delay_min), delay_max)
+
+
+def view_analysis_delay(view, typing_seconds=0):
+    window = view.window()
+
+    return estimate_analysis_delay(
+        analysis_delay(window),
+        analysis_delay_min(window),
+        analysis_delay_max(window),
+        latency=_analysis_latency_.get(view.id()),
+        size=view.size(),
+        typing_seconds=typing_seconds,
     )
 
 
-## ---
+# -- Analysis Profile
 
 
-def set_view_name(view, name):
-    if view:
-        if view.is_loading():
-            sublime.set_timeout(lambda: set_view_name(view, name), 100)
-        else:
-            view.set_name(name)
+def analysis_profile(size, data, definitions_size, findings_size):
+    """
+    Returns the analysis profile of a buffer of size (characters).
 
+    Buffers of at least definitions_size are analyzed for definitions only,
+    and buffers of at least findings_size are only linted.
+    A data (EDN) buffer has no definitions, so it's only linted instead.
+    """
+    if size >= findings_size:
+        return ANALYSIS_PROFILE_FINDINGS
 
-def view_text(view, region=None):
-    if region:
-        return view.substr(region)
-    else:
-        return view.substr(sublime.Region(0, view.size()))
+    if size >= definitions_size:
+        return ANALYSIS_PROFILE_FINDINGS if data else ANALYSIS_PROFILE_DEFINITIONS
 
+    return ANALYSIS_PROFILE_FULL
 
-def project_classpath(window):
+
+def view_analysis_profile(view):
     """
-    Returns the project classpath, or None if a classpath setting does not exist.
+    Returns a tuple of analysis profile and clj-kondo config of view.
 
-    It reads a custom "pep classpath" setting in the project file.
+    A view can override its profile with `SETTING_CLJ_KONDO_CONFIG` -
+    either a profile name, or a clj-kondo config (which is analyzed as full).
+    """
+    if override := view.settings().get(SETTING_CLJ_KONDO_CONFIG):
+        if override in ANALYSIS_PROFILE_CONFIG:
+            return override, ANALYSIS_PROFILE_CONFIG[override]
 
-    Example.sublime-project:
+        return ANALYSIS_PROFILE_FULL, override
 
-    {
-        ...
+    window = view.window()
 
-        "pep": {
-            "classpath": ["clojure", "-Spath"]
-        }
-    }
-    """
-    if classpath := project_data_classpath(window):
-        classpath = classpath if isinstance(classpath, list) else shlex.split(classpath)
+    syntax = view.syntax()
 
-        classpath_completed_process = subprocess.run(
-            classpath,
-            cwd=project_path(window),
-            text=True,
-            capture_output=True,
-        )
+    data = file_extension(view.file_name()) == ".edn" or bool(
+        syntax and "EDN" in syntax.name
+    )
 
-        classpath_completed_process.check_returncode()
+    profile = analysis_profile(
+        view.size(),
+        data,
+        analysis_profile_definitions_size(window),
+        analysis_profile_findings_size(window),
+    )
 
-        return classpath_completed_process.stdout
+    return profile, ANALYSIS_PROFILE_CONFIG[profile]
 
 
-## ---
+# ---
 
 
 def analyze_view(view, afs=DEFAULT_VIEW_ANALYSIS_FUNCTIONS):
@@ -1487,9 +4089,7 @@ def analyze_view(view, afs=DEFAULT_VIEW_ANALYSIS_FUNCTIONS):
     elif view_file_name:
         cwd = os.path.dirname(view_file_name)
 
-    analysis_config = (
-        view.settings().get(SETTING_CLJ_KONDO_CONFIG) or CLJ_KONDO_VIEW_CONFIG
-    )
+    profile, analysis_config = view_analysis_profile(view)
 
     # --lint <file>: a file can either be a normal file, directory or classpath.
     # In the case of a directory or classpath, only .clj, .cljs and .cljc will be processed.
@@ -1507,15 +4107,21 @@ def analyze_view(view, afs=DEFAULT_VIEW_ANALYSIS_FUNCTIONS):
         view_file_name or "-",
     ]
 
+    text = view_text(view)
+
+    t0 = time.time()
+
     analysis_completed_process = subprocess.run(
         analysis_subprocess_args,
         cwd=cwd,
         text=True,
         capture_output=True,
         startupinfo=startupinfo(),
-        input=view_text(view),
+        input=text,
     )
 
+    record_analysis_latency(view.id(), time.time() - t0, len(text))
+
     clj_kondo_data = None
 
     try:
@@ -1525,17 +4131,21 @@ def analyze_view(view, afs=DEFAULT_VIEW_ANALYSIS_FUNCTIONS):
 
     analysis = clj_kondo_data.get("analysis", {})
 
+    # Indexes of Java classes, keywords, symbols and locals are built for a full analysis only;
+    # they're empty otherwise.
+    full_analysis = analysis if profile == ANALYSIS_PROFILE_FULL else {}
+
     namespace_index_ = namespace_index(analysis)
 
     var_index_ = var_index(analysis)
 
-    java_class_index_ = java_class_index(analysis)
+    java_class_index_ = java_class_index(full_analysis)
 
-    keyword_index_ = keyword_index(analysis)
+    keyword_index_ = keyword_index(full_analysis)
 
-    symbol_index_ = symbol_index(analysis)
+    symbol_index_ = symbol_index(full_analysis)
 
-    local_index_ = local_index(analysis)
+    local_index_ = local_index(full_analysis)
 
     findings_ = [
         {**finding, "_semantic": TT_FINDING}
@@ -1557,7 +4167,8 @@ def analyze_view(view, afs=DEFAULT_VIEW_ANALYSIS_FUNCTIONS):
     set_view_analysis(view.id(), view_analysis_)
 
     # Update index for view - analysis for a single file (view).
-    if project_path_ := project_path(window):
+    # A partial analysis would drop the file's usages from the index.
+    if profile == ANALYSIS_PROFILE_FULL and (project_path_ := project_path(window)):
         if file_name := view.buffer().file_name():
             # Don't index non-project files.
             if pathlib.Path(project_path_) in pathlib.Path(file_name).parents:
@@ -1598,84 +4209,423 @@ def analyze_classpath(window):
         if not os.path.exists(clj_kondo_cache_directory):
             os.makedirs(clj_kondo_cache_directory)
 
-        analysis_subprocess_args = [
-            clj_kondo_path(window),
-            "--config",
-            CLJ_KONDO_CLASSPATH_CONFIG,
-            "--parallel",
-            "--lint",
-            classpath,
-        ]
+        analysis_subprocess_args = [
+            clj_kondo_path(window),
+            "--config",
+            CLJ_KONDO_CLASSPATH_CONFIG,
+            "--parallel",
+            "--lint",
+            classpath,
+        ]
+
+        analysis_completed_process = subprocess.run(
+            analysis_subprocess_args,
+            cwd=project_path(window),
+            text=True,
+            capture_output=True,
+            startupinfo=startupinfo(),
+        )
+
+        output = None
+
+        try:
+            output = json.loads(analysis_completed_process.stdout)
+        except Exception:
+            output = {}
+
+        analysis = output.get("analysis", {})
+
+        keyword_index_ = keyword_index(
+            analysis,
+            krn=False,
+        )
+
+        # There's no need to index namespace usages in the classpath.
+        namespace_index_ = namespace_index(
+            analysis,
+            nindex_usages=False,
+            nrn=False,
+            nrn_usages=False,
+        )
+
+        # There's no need to index var usages in the classpath.
+        var_index_ = var_index(
+            analysis,
+            vindex_usages=False,
+            vrn=False,
+            vrn_usages=False,
+            vspans=False,
+        )
+
+        # There's no need to index Java class usages in the classpath.
+        java_class_index_ = java_class_index(
+            analysis,
+            jindex_usages=False,
+            jrn_usages=False,
+        )
+
+        # Check if there's still a project_path - user might close the project before.
+        if project_path_ := project_path(window):
+            set_classpath_analysis(
+                project_path_,
+                {
+                    **java_class_index_,
+                    **keyword_index_,
+                    **namespace_index_,
+                    **var_index_,
+                },
+            )
+
+            if is_debug(window):
+                print(
+                    f"Pep Debug: Classpath analysis is completed; {window_project(window)} [{time.time() - t0:,.2f} seconds]"
+                )
+
+            # Prebuild Goto lists for the new analysis.
+            refresh_goto_lists(project_path_, "classpath")
+
+        return True
+
+    return False
+
+
+def analyze_classpath_async(window):
+    threading.Thread(target=lambda: analyze_classpath(window), daemon=True).start()
+
+
+def clj_kondo_paths_analysis(window, paths) -> dict:
+    """
+    Returns clj-kondo analysis of paths - files or directories joined by the path separator.
+    """
+
+    analysis_subprocess_args = [
+        clj_kondo_path(window),
+        "--config",
+        CLJ_KONDO_PATHS_CONFIG,
+        "--parallel",
+        "--lint",
+        paths,
+    ]
+
+    analysis_completed_process = subprocess.run(
+        analysis_subprocess_args,
+        cwd=project_path(window),
+        text=True,
+        capture_output=True,
+        startupinfo=startupinfo(),
+    )
+
+    output = None
+
+    try:
+        output = json.loads(analysis_completed_process.stdout)
+    except Exception:
+        output = {}
+
+    return output.get("analysis", {})
+
+
+def analyze_dependents(view, analysis):
+    """
+    Analyze files which require the namespace of view - analysis of view.
+
+    Dependents open in a view - even if the view is dirty - are analyzed from the view's content,
+    so their findings are refreshed. Other dependents didn't change, so their index is up to date;
+    they're linted only if findings of paths are cached - see Project Diagnostics.
+    At most `analyze_dependents_limit` files - open files first.
+    """
+    window = view.window()
+
+    if not window or not (project_path_ := project_path(window)):
+        return
+
+    if not (graph := namespace_graph(project_path_)):
+        return
+
+    dependent_files = set()
+
+    for namespace_definition in namespace_definitions(analysis):
+        dependent_files |= graph.dependent_files(namespace_definition.get("name"))
+
+    # Filenames in the project index are canonical - see `CLJ_KONDO_OUTPUT_JSON_CONFIG`.
+    if view_file_name := view.file_name():
+        dependent_files.discard(os.path.realpath(view_file_name))
+
+    if not dependent_files:
+        return
+
+    dependent_views = [
+        view_
+        for view_ in window.views()
+        if view_.file_name() and os.path.realpath(view_.file_name()) in dependent_files
+    ]
+
+    dependent_view_files = {
+        os.path.realpath(view_.file_name()) for view_ in dependent_views
+    }
+
+    limit = analyze_dependents_limit(window)
+
+    dependent_views = dependent_views[:limit]
+
+    # Findings of files which aren't open are only used by Project Diagnostics,
+    # so there's no point in linting them if paths aren't linted.
+    if lint_paths_on_analyze(window) or project_path_ in _findings_cache_:
+        dependent_files = sorted(dependent_files - dependent_view_files)[
+            : max(0, limit - len(dependent_views))
+        ]
+    else:
+        dependent_files = []
+
+    if is_debug(window):
+        print(
+            f"Pep Debug: Analyzing dependents of {view.file_name()}; {len(dependent_views)} view(s), {len(dependent_files)} file(s)"
+        )
+
+    for view_ in dependent_views:
+        analyze_view_async(view_)
+
+    if dependent_files:
+        with _lint_lock_:
+            lint_files(window, project_path_, dependent_files)
+
+
+# Mapping of project path to a mapping of filename to a tuple of mtime, size, digest and findings.
+_findings_cache_ = {}
+
+_lint_lock_ = threading.Lock()
+
+
+def path_files(window) -> List:
+    """
+    Returns a sorted list of files in paths which are linted by clj-kondo.
+    """
+
+    project_path_ = project_path(window)
+
+    files = set()
+
+    for path in project_data_paths(window) or []:
+        path = os.path.realpath(os.path.join(project_path_, path))
+
+        if os.path.isfile(path):
+            files.add(path)
+
+        else:
+            for dirpath, _, filenames in os.walk(path):
+                for filename in filenames:
+                    if file_extension(filename) in CLJ_KONDO_LINT_EXTENSIONS:
+                        files.add(os.path.join(dirpath, filename))
+
+    return sorted(files)
+
+
+def file_digest(filename) -> str:
+    with open(filename, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def lint_batches(filenames, max_length=LINT_FILES_MAX_LENGTH) -> List[List]:
+    """
+    Returns filenames split in batches whose --lint argument - filenames joined by the path separator -
+    is at most max_length characters long. (A filename longer than max_length is a batch of its own.)
+    """
+    batches = []
+
+    batch = []
+    batch_length = 0
+
+    for filename in filenames:
+        # Plus one for the path separator.
+        if batch and batch_length + 1 + len(filename) > max_length:
+            batches.append(batch)
+
+            batch = []
+            batch_length = 0
+
+        batch_length += len(filename) + (1 if batch else 0)
+
+        batch.append(filename)
+
+    if batch:
+        batches.append(batch)
+
+    return batches
+
+
+def clj_kondo_lint(window, project_path_, paths) -> Optional[dict]:
+    """
+    Returns a mapping of filename to findings of paths - a list of files or directories.
+
+    Returns None if clj-kondo fails, or its output can't be parsed.
+    """
+    path_separator = ";" if os.name == "nt" else ":"
+
+    lint_completed_process = subprocess.run(
+        [
+            clj_kondo_path(window),
+            "--config",
+            CLJ_KONDO_LINT_CONFIG,
+            "--parallel",
+            "--lint",
+            path_separator.join(paths),
+        ],
+        cwd=project_path_,
+        text=True,
+        capture_output=True,
+        startupinfo=startupinfo(),
+    )
+
+    try:
+        if lint_completed_process.returncode not in CLJ_KONDO_LINT_EXIT_CODES:
+            raise Exception(lint_completed_process.stderr)
+
+        output = json.loads(lint_completed_process.stdout)
+    except Exception as e:
+        if is_debug(window):
+            print(f"Pep Debug: Failed to lint: {e}")
+
+        return None
+
+    findings_by_file = {}
+
+    for finding in output.get("findings", []):
+        findings_by_file.setdefault(finding.get("filename"), []).append(
+            {**finding, "_semantic": TT_FINDING}
+        )
+
+    return findings_by_file
+
+
+def lint_files(window, project_path_, filenames, paths=None):
+    """
+    Lint filenames, and store their findings in the findings cache.
+
+    If paths - files or directories which contain filenames - is given,
+    paths are linted instead of filenames; otherwise filenames are linted in batches.
+
+    The findings cache isn't updated for a batch if clj-kondo fails.
+
+    Callers must hold `_lint_lock_`.
+    """
+    cache = _findings_cache_.setdefault(project_path_, {})
+
+    if paths:
+        batches = [(paths, filenames)]
+    else:
+        batches = [(batch, batch) for batch in lint_batches(sorted(filenames))]
+
+    for batch_paths, batch_filenames in batches:
+        findings_by_file = clj_kondo_lint(window, project_path_, batch_paths)
+
+        if findings_by_file is None:
+            continue
+
+        for filename in batch_filenames:
+            try:
+                stat = os.stat(filename)
+            except OSError:
+                continue
+
+            cache[filename] = (
+                stat.st_mtime,
+                stat.st_size,
+                file_digest(filename),
+                findings_by_file.get(filename, []),
+            )
+
+
+def lint_paths(window) -> List:
+    """
+    Lint files in paths, and returns a list of findings.
+
+    Findings are cached per file by content digest: only files which changed,
+    and files which require their namespaces, are linted again.
+    (A file's mtime and size are compared first, so unchanged files aren't read.)
+    """
+
+    if not (project_path_ := project_path(window)):
+        return []
+
+    # Paths might be linted after analysis and by Project Diagnostics at the same time.
+    with _lint_lock_:
+        return lint_paths_(window, project_path_)
+
+
+def lint_paths_(window, project_path_) -> List:
+    cache = _findings_cache_.setdefault(project_path_, {})
+
+    files = path_files(window)
+
+    # Files deleted since they were linted.
+    for filename in set(cache) - set(files):
+        cache.pop(filename)
 
-        analysis_completed_process = subprocess.run(
-            analysis_subprocess_args,
-            cwd=project_path(window),
-            text=True,
-            capture_output=True,
-            startupinfo=startupinfo(),
-        )
+    stats = {}
 
-        output = None
+    changed = set()
 
+    for filename in files:
         try:
-            output = json.loads(analysis_completed_process.stdout)
-        except Exception:
-            output = {}
+            stat = os.stat(filename)
+        except OSError:
+            continue
 
-        analysis = output.get("analysis", {})
+        stats[filename] = stat
 
-        keyword_index_ = keyword_index(
-            analysis,
-            krn=False,
-        )
+        if cached := cache.get(filename):
+            mtime, size, digest, findings = cached
 
-        # There's no need to index namespace usages in the classpath.
-        namespace_index_ = namespace_index(
-            analysis,
-            nindex_usages=False,
-            nrn=False,
-            nrn_usages=False,
-        )
+            if (mtime, size) == (stat.st_mtime, stat.st_size):
+                continue
 
-        # There's no need to index var usages in the classpath.
-        var_index_ = var_index(
-            analysis,
-            vindex_usages=False,
-            vrn=False,
-            vrn_usages=False,
-        )
+            # Touched, but not changed.
+            if file_digest(filename) == digest:
+                cache[filename] = (stat.st_mtime, stat.st_size, digest, findings)
+                continue
 
-        # There's no need to index Java class usages in the classpath.
-        java_class_index_ = java_class_index(
-            analysis,
-            jindex_usages=False,
-            jrn_usages=False,
-        )
+        changed.add(filename)
 
-        # Check if there's still a project_path - user might close the project before.
-        if project_path_ := project_path(window):
-            set_classpath_analysis(
-                project_path_,
-                {
-                    **java_class_index_,
-                    **keyword_index_,
-                    **namespace_index_,
-                    **var_index_,
-                },
-            )
+    # Files which require a changed namespace might have new findings - e.g. arity.
+    if changed and (graph := namespace_graph(project_path_)):
+        project_index_ = project_index(project_path_)
 
-            if is_debug(window):
-                print(
-                    f"Pep Debug: Classpath analysis is completed; {window_project(window)} [{time.time() - t0:,.2f} seconds]"
-                )
+        for filename in list(changed):
+            for namespace_definition in project_index_.get(filename, {}).get(
+                "namespace-definitions", []
+            ):
+                changed |= graph.dependent_files(namespace_definition.get("name"))
 
-        return True
+        changed &= set(stats)
 
-    return False
+    if changed:
+        t0 = time.time()
+
+        # Lint paths, instead of files, if every file changed - e.g. it's the first run.
+        if changed == set(stats):
+            lint_files(
+                window,
+                project_path_,
+                changed,
+                paths=[
+                    os.path.realpath(os.path.join(project_path_, path))
+                    for path in project_data_paths(window) or []
+                ],
+            )
+        else:
+            lint_files(window, project_path_, changed)
 
+        if is_debug(window):
+            print(
+                f"Pep Debug: Linted {len(changed):,} file(s) of {len(files):,} [{time.time() - t0:,.2f} seconds]"
+            )
 
-def analyze_classpath_async(window):
-    threading.Thread(target=lambda: analyze_classpath(window), daemon=True).start()
+    return [
+        finding
+        for filename in files
+        if filename in cache
+        for finding in cache[filename][3]
+    ]
 
 
 def analyze_paths(window):
@@ -1701,31 +4651,7 @@ def analyze_paths(window):
         if not os.path.exists(clj_kondo_cache_directory):
             os.makedirs(clj_kondo_cache_directory)
 
-        analysis_subprocess_args = [
-            clj_kondo_path(window),
-            "--config",
-            CLJ_KONDO_PATHS_CONFIG,
-            "--parallel",
-            "--lint",
-            paths,
-        ]
-
-        analysis_completed_process = subprocess.run(
-            analysis_subprocess_args,
-            cwd=project_path(window),
-            text=True,
-            capture_output=True,
-            startupinfo=startupinfo(),
-        )
-
-        output = None
-
-        try:
-            output = json.loads(analysis_completed_process.stdout)
-        except Exception:
-            output = {}
-
-        analysis = output.get("analysis", {})
+        analysis = clj_kondo_paths_analysis(window, paths)
 
         # Check if there's still a project_path - user might close the project before.
         if project_path_ := project_path(window):
@@ -1740,6 +4666,12 @@ def analyze_paths(window):
                     f"Pep Debug: Paths analysis is completed; {window_project(window)} [{time.time() - t0:,.2f} seconds]"
                 )
 
+            # Prebuild Goto lists for the new analysis.
+            refresh_goto_lists(project_path_, "paths")
+
+            if lint_paths_on_analyze(window):
+                lint_paths(window)
+
 
 def analyze_paths_async(window):
     threading.Thread(target=lambda: analyze_paths(window), daemon=True).start()
@@ -1790,8 +4722,9 @@ def unify_analysis(index: dict) -> dict:
 
 
 def erase_analysis_regions(view):
-    view.erase_regions("pg_pep_analysis_error")
-    view.erase_regions("pg_pep_analysis_warning")
+    if state := _annotations_.pop(view.id(), None):
+        for block in state["blocks"]:
+            view.erase_regions(findings_regions_key(block))
 
 
 # ---
@@ -2521,98 +5454,379 @@ def find_keyword_definition(analysis, keyword):
             return keyword_indexed
 
 
-def find_keyword_definitions(analysis, keyword):
+def find_keyword_definitions(analysis, keyword):
+    """
+    Returns a list of keyword which has "definition semantics":
+    - Clojure Spec
+    - re-frame
+    """
+    return [
+        keyword_ for keyword_ in find_keywords(analysis, keyword) if keyword_.get("reg")
+    ]
+
+
+# Deprecated
+# See `find_symbol_definitions`
+def find_symbol_definition(analysis, sym):
+    """
+    Returns Var definition for symbol `sym`.
+    """
+    k = (symbol_namespace(sym), symbol_name(sym))
+
+    for var_definition in analysis_vindex(analysis).get(k, []):
+        return var_definition
+
+
+def find_symbol_definitions(analysis, sym):
+    """
+    Returns a list of Var definition for symbol `sym`.
+    """
+    k = (symbol_namespace(sym), symbol_name(sym))
+
+    return analysis_vindex(analysis).get(k, [])
+
+
+def find_symbol_usages(analysis, thingy):
+    """
+    Returns Var usages for symbol thingy.
+    """
+    k = (symbol_namespace(thingy), symbol_name(thingy))
+
+    var_usages = analysis_vindex_usages(analysis).get(k, [])
+
+    symbol_usages = analysis_sindex(analysis).get(thingy.get("symbol", ""), [])
+
+    return symbol_usages + var_usages
+
+
+def find_usages(analysis, thingy) -> Optional[List]:
+    thingy_semantic = thingy["_semantic"]
+
+    if thingy_semantic == TT_KEYWORD:
+        return find_keyword_usages(analysis, thingy)
+
+    elif thingy_semantic == TT_LOCAL or thingy_semantic == TT_LOCAL_USAGE:
+        return find_local_usages(analysis, thingy)
+
+    elif thingy_semantic == TT_VAR_DEFINITION or thingy_semantic == TT_VAR_USAGE:
+        return find_var_usages(analysis, thingy)
+
+    elif thingy_semantic == TT_SYMBOL:
+        return find_symbol_usages(analysis, thingy)
+
+    elif thingy_semantic == TT_JAVA_CLASS_USAGE:
+        return find_java_class_usages(analysis, thingy)
+
+    elif (
+        thingy_semantic == TT_NAMESPACE_DEFINITION
+        or thingy_semantic == TT_NAMESPACE_USAGE
+        or thingy_semantic == TT_NAMESPACE_USAGE_ALIAS
+    ):
+        return find_namespace_usages(analysis, thingy)
+
+
+def find_definitions(analysis, thingy) -> Optional[List]:
+    thingy_semantic = thingy["_semantic"]
+
+    if thingy_semantic == TT_LOCAL_USAGE:
+        if local_binding := find_local_binding(analysis, thingy):
+            return [local_binding]
+
+    elif (
+        thingy_semantic == TT_NAMESPACE_USAGE
+        or thingy_semantic == TT_NAMESPACE_USAGE_ALIAS
+    ):
+        return find_namespace_definitions(analysis, thingy)
+
+    elif thingy_semantic == TT_VAR_USAGE:
+        return find_var_definitions(analysis, thingy)
+
+    elif thingy_semantic == TT_KEYWORD:
+        return find_keyword_definitions(analysis, thingy)
+
+    elif thingy_semantic == TT_SYMBOL:
+        return find_symbol_definitions(analysis, thingy)
+
+
+def usages_by_file(thingy_usages):
+    """
+    Yields a tuple of filename and usages in that file.
+
+    Usages are deduped, files are sorted by name, and usages are sorted by row and column.
+    """
+
+    usages_by_filename = {}
+
+    for thingy_usage in thingy_dedupe(thingy_usages):
+        usages_by_filename.setdefault(thingy_usage["filename"], []).append(thingy_usage)
+
+    for filename in sorted(usages_by_filename):
+        yield filename, sorted(
+            usages_by_filename[filename],
+            key=lambda thingy_usage: [
+                thingy_usage.get("row"),
+                thingy_usage.get("col"),
+            ],
+        )
+
+
+def find_usages_in_files(project_path, thingy):
+    """
+    Yields a tuple of filename and usages of thingy in that file - one file at a time.
+
+    If paths analysis is indexed for the current version of the project index,
+    usages are found in its index, and grouped by file.
+    Otherwise files are indexed one at a time, so the first usages are found
+    without having to index the paths analysis as a whole.
+    """
+
+    # Read version before index - in case the index is updated in between.
+    version = project_index_version(project_path)
+
+    project_index_ = project_index(project_path)
+
+    if analysis := cached_paths_analysis(project_path, version):
+        yield from usages_by_file(find_usages(analysis, thingy) or [])
+        return
+
+    for filename in sorted(project_index_):
+        file_analysis = index_paths_analysis(project_index_[filename])
+
+        if thingy_usages := find_usages(file_analysis, thingy):
+            yield from usages_by_file(thingy_usages)
+
+
+def find_usages_by_file(project_path, view_analysis_, thingy):
+    """
+    Yields a tuple of filename and usages of thingy in that file.
+
+    Usages are found in paths, or in view if there are no usages in paths.
+    """
+
+    found = False
+
+    for filename, thingy_usages in find_usages_in_files(project_path, thingy):
+        found = True
+
+        yield filename, thingy_usages
+
+    if not found:
+        yield from usages_by_file(find_usages(view_analysis_, thingy) or [])
+
+
+def resolve_definitions(
+    view_analysis_, paths_definitions_, classpath_analysis_, thingy
+) -> Optional[List]:
+    """
+    Returns definitions of thingy - found in view first, only if not found try paths and classpath analysis.
+
+    `paths_definitions_` is paths analysis, or paths definitions - see `paths_definitions`.
+    """
+    return (
+        find_definitions(analysis=view_analysis_, thingy=thingy)
+        or find_definitions(analysis=paths_definitions_, thingy=thingy)
+        or find_definitions(analysis=classpath_analysis_, thingy=thingy)
+    )
+
+
+def resolve_doc_definition(
+    view_analysis_, paths_definitions_, classpath_analysis_, thingy
+) -> Optional[dict]:
+    """
+    Returns the Var, namespace or symbol definition of thingy which is documented by Show Documentation.
+
+    `paths_definitions_` is paths analysis, or paths definitions - see `paths_definitions`.
+    """
+    thingy_semantic = thingy["_semantic"]
+
+    if thingy_semantic == TT_VAR_DEFINITION or thingy_semantic == TT_VAR_USAGE:
+        # Try to find Var definition in view first,
+        # only if not found try paths and project analysis.
+        return (
+            find_var_definition(view_analysis_, thingy)
+            or find_var_definition(classpath_analysis_, thingy)
+            or find_var_definition(paths_definitions_, thingy)
+        )
+
+    elif (
+        thingy_semantic == TT_NAMESPACE_DEFINITION
+        or thingy_semantic == TT_NAMESPACE_USAGE
+        or thingy_semantic == TT_NAMESPACE_USAGE_ALIAS
+    ):
+        return (
+            find_namespace_definition(view_analysis_, thingy)
+            or find_namespace_definition(classpath_analysis_, thingy)
+            or find_namespace_definition(paths_definitions_, thingy)
+        )
+
+    elif thingy_semantic == TT_SYMBOL:
+        return (
+            find_symbol_definition(view_analysis_, thingy)
+            or find_symbol_definition(classpath_analysis_, thingy)
+            or find_symbol_definition(paths_definitions_, thingy)
+        )
+
+
+# -- Prefetch
+
+# Maximum number of regions, in a selection, whose definitions are prefetched.
+PREFETCH_MAX_REGIONS = 8
+
+# Mapping of View ID to a mapping of prefetch key to prefetched definitions and doc.
+_prefetch_ = {}
+
+
+def prefetch_key(view_analysis_, project_path_, thingy):
     """
-    Returns a list of keyword which has "definition semantics":
-    - Clojure Spec
-    - re-frame
+    Returns the key of thingy's prefetched definitions and doc.
+
+    Prefetched data is valid for as long as the view, paths definitions and classpath analysis don't change.
     """
-    return [
-        keyword_ for keyword_ in find_keywords(analysis, keyword) if keyword_.get("reg")
-    ]
+    return (
+        view_analysis_.get("view_change_count"),
+        paths_definitions_version(project_path_),
+        classpath_analysis_version(project_path_),
+        thingy["_semantic"],
+        thingy.get("row"),
+        thingy.get("col"),
+        thingy.get("name-row"),
+        thingy.get("name-col"),
+    )
 
 
-# Deprecated
-# See `find_symbol_definitions`
-def find_symbol_definition(analysis, sym):
+def prefetch(view):
     """
-    Returns Var definition for symbol `sym`.
+    Resolve definitions, and render doc, of thingy in each region of the selection.
+
+    It's called on a worker thread, after the selection is settled,
+    so Goto Definition and Show Documentation don't have to wait - see `prefetched`.
     """
-    k = (symbol_namespace(sym), symbol_name(sym))
 
-    for var_definition in analysis_vindex(analysis).get(k, []):
-        return var_definition
+    if staled_analysis(view):
+        return
 
+    view_id_ = view.id()
+    view_analysis_ = view_analysis(view_id_)
+    project_path_ = project_path(view.window())
+    paths_definitions_ = paths_definitions(project_path_)
+    classpath_analysis_ = classpath_analysis(project_path_)
 
-def find_symbol_definitions(analysis, sym):
-    """
-    Returns a list of Var definition for symbol `sym`.
-    """
-    k = (symbol_namespace(sym), symbol_name(sym))
+    cached = _prefetch_.get(view_id_, {})
 
-    return analysis_vindex(analysis).get(k, [])
+    prefetched_ = {}
 
+    for region in list(view.sel())[:PREFETCH_MAX_REGIONS]:
+        if thingy := thingy_at(view, view_analysis_, region):
+            key = prefetch_key(view_analysis_, project_path_, thingy)
 
-def find_symbol_usages(analysis, thingy):
-    """
-    Returns Var usages for symbol thingy.
-    """
-    k = (symbol_namespace(thingy), symbol_name(thingy))
+            if key in cached:
+                prefetched_[key] = cached[key]
+                continue
 
-    var_usages = analysis_vindex_usages(analysis).get(k, [])
+            definitions = resolve_definitions(
+                view_analysis_,
+                paths_definitions_,
+                classpath_analysis_,
+                thingy,
+            )
 
-    symbol_usages = analysis_sindex(analysis).get(thingy.get("symbol", ""), [])
+            doc_definition = resolve_doc_definition(
+                view_analysis_,
+                paths_definitions_,
+                classpath_analysis_,
+                thingy,
+            )
 
-    return symbol_usages + var_usages
+            # Extract JAR source ahead of Goto Definition.
+            if definitions and len(thingy_dedupe(definitions)) == 1:
+                filename = definitions[0].get("filename", "")
 
+                if ".jar:" in filename:
+                    try:
+                        open_jar(filename, lambda _: None)
+                    except Exception:
+                        pass
 
-def find_usages(analysis, thingy) -> Optional[List]:
-    thingy_semantic = thingy["_semantic"]
+            prefetched_[key] = {
+                "definitions": definitions,
+                "doc": definition_doc_minihtml(doc_definition)
+                if doc_definition
+                else None,
+            }
 
-    if thingy_semantic == TT_KEYWORD:
-        return find_keyword_usages(analysis, thingy)
+    _prefetch_[view_id_] = prefetched_
 
-    elif thingy_semantic == TT_LOCAL or thingy_semantic == TT_LOCAL_USAGE:
-        return find_local_usages(analysis, thingy)
 
-    elif thingy_semantic == TT_VAR_DEFINITION or thingy_semantic == TT_VAR_USAGE:
-        return find_var_usages(analysis, thingy)
+# Mapping of View ID to View waiting to be prefetched - see `prefetch_async`.
+_prefetch_pending_ = {}
 
-    elif thingy_semantic == TT_SYMBOL:
-        return find_symbol_usages(analysis, thingy)
+_prefetch_lock_ = threading.Lock()
 
-    elif thingy_semantic == TT_JAVA_CLASS_USAGE:
-        return find_java_class_usages(analysis, thingy)
+# Thread which prefetches pending views - None if there's nothing to prefetch.
+_prefetch_worker_ = None
 
-    elif (
-        thingy_semantic == TT_NAMESPACE_DEFINITION
-        or thingy_semantic == TT_NAMESPACE_USAGE
-        or thingy_semantic == TT_NAMESPACE_USAGE_ALIAS
-    ):
-        return find_namespace_usages(analysis, thingy)
 
+def prefetch_worker():
+    global _prefetch_worker_
 
-def find_definitions(analysis, thingy) -> Optional[List]:
-    thingy_semantic = thingy["_semantic"]
+    while True:
+        with _prefetch_lock_:
+            if not _prefetch_pending_:
+                _prefetch_worker_ = None
+                return
 
-    if thingy_semantic == TT_LOCAL_USAGE:
-        if local_binding := find_local_binding(analysis, thingy):
-            return [local_binding]
+            view_id = next(iter(_prefetch_pending_))
 
-    elif (
-        thingy_semantic == TT_NAMESPACE_USAGE
-        or thingy_semantic == TT_NAMESPACE_USAGE_ALIAS
-    ):
-        return find_namespace_definitions(analysis, thingy)
+            view = _prefetch_pending_.pop(view_id)
 
-    elif thingy_semantic == TT_VAR_USAGE:
-        return find_var_definitions(analysis, thingy)
+        try:
+            prefetch(view)
+        except Exception:
+            print("Pep: Error: Prefetch", traceback.format_exc())
 
-    elif thingy_semantic == TT_KEYWORD:
-        return find_keyword_definitions(analysis, thingy)
 
-    elif thingy_semantic == TT_SYMBOL:
-        return find_symbol_definitions(analysis, thingy)
+def prefetch_async(view):
+    """
+    Prefetch view on a worker thread - see `prefetch`.
+
+    There's at most one worker, which is started on demand and exits when there's nothing to prefetch;
+    a view which is already waiting to be prefetched isn't queued again.
+    """
+    global _prefetch_worker_
+
+    with _prefetch_lock_:
+        _prefetch_pending_[view.id()] = view
+
+        if _prefetch_worker_ is None:
+            _prefetch_worker_ = threading.Thread(target=prefetch_worker, daemon=True)
+            _prefetch_worker_.start()
+
+
+def prefetched(view, regions, k):
+    """
+    Returns a list of prefetched `k` - "definitions" or "doc" - of thingy in regions,
+    or None if any of it wasn't prefetched.
+    """
+
+    if staled_analysis(view):
+        return None
+
+    view_analysis_ = view_analysis(view.id())
+    project_path_ = project_path(view.window())
+    prefetched_ = _prefetch_.get(view.id(), {})
+
+    l = []
+
+    for region in regions:
+        if thingy := thingy_at(view, view_analysis_, region):
+            key = prefetch_key(view_analysis_, project_path_, thingy)
+
+            if key not in prefetched_:
+                return None
+
+            l.append(prefetched_[key][k])
+
+    return l
 
 
 # ---
@@ -2799,7 +6013,47 @@ def find_thingy_text_regions(view, analysis, thingy):
     return thingy_regions
 
 
-def annotate_view(view):
+# Number of rows, above and below the visible region, whose findings are rendered as annotations.
+ANNOTATION_VIEWPORT_MARGIN = 100
+
+# Findings are annotated in blocks of rows - a block is the unit of diffing and of rendering.
+ANNOTATION_BLOCK_ROWS = 50
+
+# Mapping of View ID to its annotated findings - see `annotate_findings`.
+_annotations_ = {}
+
+
+def finding_key(finding):
+    return (
+        finding.get("level"),
+        finding.get("type"),
+        finding.get("row"),
+        finding.get("col"),
+        finding.get("end-row"),
+        finding.get("end-col"),
+        finding.get("message"),
+    )
+
+
+def findings_regions_key(block):
+    level, n = block
+
+    return f"pg_pep_findings_{level}_{n}"
+
+
+def annotate_findings(view, findings, view_change_count=None):
+    """
+    Annotate findings - warnings and errors - in view.
+
+    view_change_count is the change count of the view when findings were analyzed.
+
+    Findings are grouped, by level, in blocks of `ANNOTATION_BLOCK_ROWS` rows,
+    and each block has its own regions key. Blocks are diffed against the ones
+    annotated before, so only blocks whose findings changed are drawn again.
+    A block's annotations (minihtml) are only rendered if the block is near
+    the visible region - see `refresh_annotations`.
+    """
+
     def finding_region(finding):
         line_start = finding["row"] - 1
         line_end = (finding.get("end-row") or finding.get("row")) - 1
@@ -2811,87 +6065,376 @@ def annotate_view(view):
 
         return sublime.Region(pa, pb)
 
+    # Settings and styles are read once per pass.
+    font_size = annotation_font_size(view.window())
+
     def finding_minihtml(finding):
         return f"""
         <body>
             <div>
-                <span style="font-size:{annotation_font_size(view.window())}">
+                <span style="font-size:{font_size}">
                     {htmlify(finding["message"])}
                 </span>
             </div>
         </body>
         """
 
-    # Erase regions from previous analysis.
-    erase_analysis_regions(view)
+    styles = {
+        "error": (
+            "region.redish",
+            view.style_for_scope("region.redish").get("foreground") or "red",
+        ),
+        "warning": (
+            "region.orangish",
+            view.style_for_scope("region.orangish").get("foreground") or "orange",
+        ),
+    }
+
+    visible_region = view.visible_region()
+
+    first_row, _ = view.rowcol(visible_region.begin())
+    last_row, _ = view.rowcol(visible_region.end())
+
+    first_row = first_row + 1 - ANNOTATION_VIEWPORT_MARGIN
+    last_row = last_row + 1 + ANNOTATION_VIEWPORT_MARGIN
+
+    state = _annotations_.setdefault(
+        view.id(),
+        {
+            "findings": [],
+            "view_change_count": None,
+            "blocks": {},
+        },
+    )
+
+    state["findings"] = findings
+    state["view_change_count"] = view_change_count
+
+    # Mapping of block - tuple of level and block number - to a tuple of
+    # its findings' keys and True if its annotations are rendered.
+    annotated = state["blocks"]
+
+    blocks = {}
+
+    for finding in findings:
+        if finding.get("level") in styles:
+            block = (finding["level"], finding["row"] // ANNOTATION_BLOCK_ROWS)
+
+            blocks.setdefault(block, []).append(finding)
+
+    for block in set(annotated) - set(blocks):
+        del annotated[block]
 
+        view.erase_regions(findings_regions_key(block))
+
+    for block, block_findings in blocks.items():
+        level, n = block
+
+        near = (
+            n * ANNOTATION_BLOCK_ROWS <= last_row
+            and (n + 1) * ANNOTATION_BLOCK_ROWS > first_row
+        )
+
+        keys = [finding_key(finding) for finding in block_findings]
+
+        if previous := annotated.get(block):
+            previous_keys, has_annotations = previous
+
+            if previous_keys == keys and (has_annotations or not near):
+                continue
+
+        scope, color = styles[level]
+
+        view.add_regions(
+            findings_regions_key(block),
+            [finding_region(finding) for finding in block_findings],
+            scope=scope,
+            annotations=[finding_minihtml(finding) for finding in block_findings]
+            if near
+            else [],
+            annotation_color=color,
+            flags=(
+                sublime.DRAW_SQUIGGLY_UNDERLINE
+                | sublime.DRAW_NO_FILL
+                | sublime.DRAW_NO_OUTLINE
+            ),
+        )
+
+        annotated[block] = (keys, near)
+
+
+def refresh_annotations(view):
+    """
+    Render annotations of findings which are now near the visible region - e.g. after scrolling.
+
+    Findings' rows are only valid for the analyzed text, so it's a no-op if the analysis is staled,
+    or if findings were annotated from a different analysis than the current one.
+    """
+    # Annotations might have been disabled since findings were annotated.
+    if view.settings().get(SETTING_ANNOTATE_VIEW) is False:
+        return
+
+    if staled_analysis(view):
+        return
+
+    if not (state := _annotations_.get(view.id())):
+        return
+
+    if state["view_change_count"] == analysis_view_change_count(view):
+        annotate_findings(view, state["findings"], state["view_change_count"])
+
+
+def viewport_annotated(view) -> bool:
+    """
+    Returns True if view has annotations which depend on its visible region -
+    usage counts, or findings (see `refresh_annotations`).
+    """
+    if annotate_usage_counts_enabled(view.window()):
+        return True
+
+    if view.settings().get(SETTING_ANNOTATE_VIEW) is False:
+        return False
+
+    return bool((state := _annotations_.get(view.id())) and state["blocks"])
+
+
+def poll_viewport_async(view):
+    """
+    Start polling the visible region of view, if it's the active view - see `PgPepViewListener.poll_viewport`.
+
+    Polling stops when there's nothing to annotate, so it's started again after view is annotated.
+    """
+    if not (window := view.window()) or not (active_view := window.active_view()):
+        return
+
+    if active_view.id() != view.id():
+        return
+
+    if listener := sublime_plugin.find_view_event_listener(view, PgPepViewListener):
+        debounce((view.id(), "viewport"), 0, listener.poll_viewport)
+
+
+def annotate_view(view):
     # Skip annotation if view explicitly set the custom setting to disable it.
     if view.settings().get(SETTING_ANNOTATE_VIEW) is False:
+        erase_analysis_regions(view)
+        return
+
+    analysis = view_analysis(view.id())
+
+    annotate_findings(
+        view,
+        analysis_findings(analysis),
+        analysis.get("view_change_count"),
+    )
+
+
+# Mapping of View ID to the key of its usage count annotations - see `annotate_usage_counts`.
+_usage_count_annotations_ = {}
+
+
+def annotate_usage_counts(view):
+    """
+    Annotate Var definitions in the visible region of view with their usage count in paths.
+
+    Counts are read from the usage count index, and annotations are only updated
+    if the index, the view analysis or the visible region changed.
+    """
+
+    window = view.window()
+
+    if not window or not annotate_usage_counts_enabled(window):
+        if _usage_count_annotations_.pop(view.id(), None):
+            view.erase_regions(USAGE_COUNTS_REGIONS_KEY)
+
+        return
+
+    if staled_analysis(view):
+        return
+
+    if not (usage_count_index_ := usage_count_index(project_path(window))):
         return
 
     analysis = view_analysis(view.id())
 
-    findings = analysis_findings(analysis)
+    visible_region = view.visible_region()
+
+    first_row, _ = view.rowcol(visible_region.begin())
+    last_row, _ = view.rowcol(visible_region.end())
+
+    key = (
+        usage_count_index_.version,
+        analysis.get("view_change_count"),
+        first_row,
+        last_row,
+    )
+
+    if _usage_count_annotations_.get(view.id()) == key:
+        return
+
+    _usage_count_annotations_[view.id()] = key
+
+    regions = []
+    minihtmls = []
+
+    font_size = annotation_font_size(window)
+
+    vrn = analysis_vrn(analysis)
+
+    for row in range(first_row + 1, last_row + 2):
+        for var_definition in vrn.get(row, []):
+            count = usage_count_index_.count(
+                var_definition.get("ns"),
+                var_definition.get("name"),
+            )
+
+            regions.append(var_definition_region(view, var_definition))
+
+            minihtmls.append(
+                f"""
+                <body>
+                    <span style="font-size:{font_size}">{count} usage{"" if count == 1 else "s"}</span>
+                </body>
+                """
+            )
+
+    grayish = view.style_for_scope("comment").get("foreground")
+
+    view.add_regions(
+        USAGE_COUNTS_REGIONS_KEY,
+        regions,
+        scope="comment",
+        annotations=minihtmls,
+        annotation_color=grayish or "gray",
+        flags=sublime.DRAW_NO_FILL | sublime.DRAW_NO_OUTLINE,
+    )
+
+
+# ---
+
+
+class ScopeInputHandler(sublime_plugin.ListInputHandler):
+    def __init__(self, scopes):
+        self.scopes = scopes
+
+    def name(self):
+        return "scope"
+
+    def list_items(self):
+        return [(scope.capitalize(), scope) for scope in self.scopes]
+
+    def placeholder(self):
+        return "Scope"
+
+
+class FilenameInputHandler(sublime_plugin.ListInputHandler):
+    def __init__(self, thingy_list, on_cancel=None):
+        self.thingy_list = thingy_list
+        self.on_cancel = on_cancel
+
+    def cancel(self):
+        if self.on_cancel:
+            self.on_cancel()
+
+    def name(self):
+        return "filename"
+
+    def list_items(self):
+        filename_count = {}
+
+        for thingy in self.thingy_list:
+            if filename := thingy.get("filename"):
+                filename_count[filename] = filename_count.get(filename, 0) + 1
+
+        return [
+            (f"{filename} ({count:,})", filename)
+            for filename, count in sorted(filename_count.items())
+        ]
+
+    def placeholder(self):
+        return "File"
+
+
+# Mapping of Window ID to its active SymbolSearchInputHandler.
+_symbol_search_ = {}
+
+
+class SymbolSearchInputHandler(sublime_plugin.ListInputHandler):
+    """
+    Lists the best matches for query in paths and classpath.
+
+    The list is updated as the user types - see `PgPepEventListener.on_modified_async`.
+    """
+
+    def __init__(self, window, query=""):
+        self.window = window
+        self.query = query
+
+    def name(self):
+        return "location"
+
+    def placeholder(self):
+        return "Search symbols"
+
+    def initial_text(self):
+        return self.query
 
-    warning_region_set = []
-    warning_minihtml_set = []
+    def list_items(self):
+        _symbol_search_[self.window.id()] = self
 
-    error_region_set = []
-    error_minihtml_set = []
+        thingy_list = search_symbols(
+            project_path(self.window),
+            self.query,
+            search_symbols_max_items(self.window),
+        )
 
-    for finding in findings:
-        if finding["level"] == "error":
-            error_region_set.append(finding_region(finding))
-            error_minihtml_set.append(finding_minihtml(finding))
-        elif finding["level"] == "warning":
-            warning_region_set.append(finding_region(finding))
-            warning_minihtml_set.append(finding_minihtml(finding))
+        return [
+            sublime.ListInputItem(
+                thingy_name(thingy),
+                thingy_location(thingy),
+                details=thingy.get("filename", ""),
+                annotation=" ".join(thingy.get("arglist-strs", [])),
+                kind=thingy_kind(thingy["_semantic"], thingy),
+            )
+            for thingy in thingy_list
+        ]
 
-    redish = view.style_for_scope("region.redish").get("foreground")
-    orangish = view.style_for_scope("region.orangish").get("foreground")
+    def deactivate(self):
+        if _symbol_search_.get(self.window.id()) is self:
+            _symbol_search_.pop(self.window.id())
 
-    view.add_regions(
-        "pg_pep_analysis_error",
-        error_region_set,
-        scope="region.redish",
-        annotations=error_minihtml_set,
-        annotation_color=redish or "red",
-        flags=(
-            sublime.DRAW_SQUIGGLY_UNDERLINE
-            | sublime.DRAW_NO_FILL
-            | sublime.DRAW_NO_OUTLINE
-        ),
-    )
+    def confirm(self, value):
+        self.deactivate()
 
-    view.add_regions(
-        "pg_pep_analysis_warning",
-        warning_region_set,
-        scope="region.orangish",
-        annotations=warning_minihtml_set,
-        annotation_color=orangish or "orange",
-        flags=(
-            sublime.DRAW_SQUIGGLY_UNDERLINE
-            | sublime.DRAW_NO_FILL
-            | sublime.DRAW_NO_OUTLINE
-        ),
-    )
+    def cancel(self):
+        self.deactivate()
 
 
-# ---
+def refresh_symbol_search(window, query):
+    """
+    Show symbol search again, for query, if it's still active and its query has changed.
+    """
+    if handler := _symbol_search_.get(window.id()):
+        if handler.query != query:
+            window.run_command(
+                "show_overlay",
+                {
+                    "overlay": "command_palette",
+                    "command": "pg_pep_search_symbols",
+                    "args": {"query": query},
+                },
+            )
 
 
-class ScopeInputHandler(sublime_plugin.ListInputHandler):
-    def __init__(self, scopes):
-        self.scopes = scopes
+class QueryInputHandler(sublime_plugin.TextInputHandler):
+    def __init__(self, placeholder=""):
+        self.placeholder_ = placeholder
 
     def name(self):
-        return "scope"
-
-    def list_items(self):
-        return [(scope.capitalize(), scope) for scope in self.scopes]
+        return "query"
 
     def placeholder(self):
-        return "Scope"
+        return self.placeholder_
 
 
 class ReplaceTextInputHandler(sublime_plugin.TextInputHandler):
@@ -2913,6 +6456,65 @@ class PgPepClearCacheCommand(sublime_plugin.WindowCommand):
             print("Pep Debug: Cleared cache")
 
 
+class PgPepCancelTaskCommand(sublime_plugin.WindowCommand):
+    """
+    Cancel the running Task, e.g. Find Usages, Goto Definition.
+    """
+
+    def run(self):
+        if cancel_task(self.window):
+            self.window.status_message("Pep: Cancelled")
+
+    def is_enabled(self):
+        return task_running(self.window)
+
+
+class PgPepGotoNarrowCommand(sublime_plugin.WindowCommand):
+    """
+    Goto thingy in a file - narrow the last Goto list by file.
+
+    See `goto_thingy_narrow`.
+    """
+
+    def input(self, args):
+        if "filename" not in args:
+            if narrow := _goto_narrow_.get(self.window.id()):
+                # The list might be large - don't keep it once it's narrowed, or cancelled.
+                return FilenameInputHandler(
+                    narrow["thingy_list"],
+                    on_cancel=lambda: _goto_narrow_.pop(self.window.id(), None),
+                )
+
+    def run(self, filename):
+        if narrow := _goto_narrow_.pop(self.window.id(), None):
+            goto_thingy(
+                self.window,
+                [
+                    thingy
+                    for thingy in narrow["thingy_list"]
+                    if thingy.get("filename") == filename
+                ],
+                goto_on_highlight=narrow["goto_on_highlight"],
+                goto_side_by_side=narrow["goto_side_by_side"],
+                quick_panel_item_opts=narrow["quick_panel_item_opts"],
+            )
+
+
+class PgPepSearchSymbolsCommand(sublime_plugin.WindowCommand):
+    """
+    Search namespaces, Vars and keywords in paths and classpath by substring.
+
+    See `TrigramIndex`.
+    """
+
+    def input(self, args):
+        if "location" not in args:
+            return SymbolSearchInputHandler(self.window, args.get("query", ""))
+
+    def run(self, location, query=""):
+        goto(self.window, location)
+
+
 class PgPepAnalyzeCommand(sublime_plugin.WindowCommand):
     def input(self, args):
         if "scope" not in args:
@@ -3010,126 +6612,132 @@ class PgPepShowNameCommand(sublime_plugin.TextCommand):
             )
 
 
-class PgPepShowDocCommand(sublime_plugin.TextCommand):
-    def run(self, edit, show="popup"):
-        view_analysis_ = view_analysis(self.view.id())
+# Maximum number of doc minihtml kept in the cache - see `definition_doc_minihtml`.
+DOC_MINIHTML_CACHE_SIZE = 2000
 
-        project_path_ = project_path(self.view.window())
+_doc_minihtml_lock_ = threading.Lock()
 
-        def paths_analysis_delay():
-            analysis = None
+# Mapping of definition key to its doc minihtml - least recently used first.
+_doc_minihtml_ = collections.OrderedDict()
 
-            def f():
-                nonlocal analysis
-                if analysis is None:
-                    analysis = paths_analysis(project_path_)
-                return analysis
 
-            return f
+def definition_doc_key(definition):
+    """
+    Returns the key of a definition's doc minihtml - everything that's rendered.
+    """
+    return (
+        definition.get("filename"),
+        definition.get("row"),
+        definition.get("col"),
+        definition.get("name-row"),
+        definition.get("name-col"),
+        definition.get("ns"),
+        definition.get("name"),
+        tuple(definition.get("arglist-strs", [])),
+        definition.get("doc"),
+    )
 
-        paths_analysis_ = paths_analysis_delay()
 
-        classpath_analysis_ = classpath_analysis(project_path_)
+def definition_doc_minihtml(definition) -> str:
+    """
+    Returns minihtml with name, arglists and doc of a Var or namespace definition.
 
-        minihtmls = []
+    Minihtml is cached by everything that's rendered - see `definition_doc_key` - so it's never stale.
+    At most `DOC_MINIHTML_CACHE_SIZE` are kept; the least recently used is dropped first.
+    """
+    key = definition_doc_key(definition)
 
-        for region in self.view.sel():
-            definition = None
+    with _doc_minihtml_lock_:
+        if (minihtml := _doc_minihtml_.get(key)) is not None:
+            _doc_minihtml_.move_to_end(key)
 
-            if thingy := thingy_at(self.view, view_analysis_, region):
-                thingy_semantic = thingy["_semantic"]
+            return minihtml
 
-                if (
-                    thingy_semantic == TT_VAR_DEFINITION
-                    or thingy_semantic == TT_VAR_USAGE
-                ):
-                    # Try to find Var definition in view first,
-                    # only if not found try paths and project analysis.
-                    definition = (
-                        find_var_definition(view_analysis_, thingy)
-                        or find_var_definition(classpath_analysis_, thingy)
-                        or find_var_definition(paths_analysis_(), thingy)
-                    )
+    minihtml = render_definition_doc_minihtml(definition)
 
-                elif (
-                    thingy_semantic == TT_NAMESPACE_DEFINITION
-                    or thingy_semantic == TT_NAMESPACE_USAGE
-                    or thingy_semantic == TT_NAMESPACE_USAGE_ALIAS
-                ):
-                    definition = (
-                        find_namespace_definition(view_analysis_, thingy)
-                        or find_namespace_definition(classpath_analysis_, thingy)
-                        or find_namespace_definition(paths_analysis_(), thingy)
-                    )
+    with _doc_minihtml_lock_:
+        _doc_minihtml_[key] = minihtml
 
-                elif thingy_semantic == TT_SYMBOL:
-                    definition = (
-                        find_symbol_definition(view_analysis_, thingy)
-                        or find_symbol_definition(classpath_analysis_, thingy)
-                        or find_symbol_definition(paths_analysis_(), thingy)
-                    )
+        while len(_doc_minihtml_) > DOC_MINIHTML_CACHE_SIZE:
+            _doc_minihtml_.popitem(last=False)
 
-            if definition:
-                # Name
-                # ---
+    return minihtml
 
-                name = definition.get("name", "")
-                name = inspect.cleandoc(html.escape(name))
 
-                ns = definition.get("ns", "")
-                ns = inspect.cleandoc(html.escape(ns))
+def render_definition_doc_minihtml(definition) -> str:
+    """
+    Renders minihtml with name, arglists and doc of a Var or namespace definition.
+    """
 
-                qualified_name = f"{ns}/{name}" if ns else name
+    # Name
+    # ---
 
-                goto_command_url = sublime.command_url(
-                    "pg_pep_open_file",
-                    {"location": thingy_location(definition)},
-                )
+    name = definition.get("name", "")
+    name = inspect.cleandoc(html.escape(name))
 
-                name_minihtml = f"""
-                <p class="name">
-                    <a href="{goto_command_url}"><b>{qualified_name}</b></a>
-                </p>
-                """
+    ns = definition.get("ns", "")
+    ns = inspect.cleandoc(html.escape(ns))
 
-                # Arglists
-                # ---
+    qualified_name = f"{ns}/{name}" if ns else name
 
-                arglists = definition.get("arglist-strs", [])
+    goto_command_url = sublime.command_url(
+        "pg_pep_open_file",
+        {"location": thingy_location(definition)},
+    )
 
-                arglists_minihtml = ""
+    name_minihtml = f"""
+    <p class="name">
+        <a href="{goto_command_url}"><b>{qualified_name}</b></a>
+    </p>
+    """
 
-                if arglists:
-                    arglists_minihtml = """<p class="arglists">"""
+    # Arglists
+    # ---
 
-                    for arglist in arglists:
-                        arglists_minihtml += f"<code>{htmlify(arglist)}</code><br/>"
+    arglists = definition.get("arglist-strs", [])
 
-                    arglists_minihtml += """</p>"""
+    arglists_minihtml = ""
 
-                # Doc
-                # ---
+    if arglists:
+        arglists_minihtml = """<p class="arglists">"""
 
-                doc = definition.get("doc")
+        for arglist in arglists:
+            arglists_minihtml += f"<code>{htmlify(arglist)}</code><br/>"
 
-                doc_minihtml = ""
+        arglists_minihtml += """</p>"""
 
-                if doc:
-                    doc = re.sub(r"\s", "&nbsp;", htmlify(doc))
+    # Doc
+    # ---
 
-                    doc_minihtml = f"""<p class="doc">{doc}</p>"""
+    doc = definition.get("doc")
 
-                minihtmls.append(
-                    f"""
-                        {name_minihtml}
+    doc_minihtml = ""
 
-                        {arglists_minihtml}
+    if doc:
+        doc = re.sub(r"\s", "&nbsp;", htmlify(doc))
 
-                        {doc_minihtml}
-                    """
-                )
+        doc_minihtml = f"""<p class="doc">{doc}</p>"""
+
+    return f"""
+        {name_minihtml}
+
+        {arglists_minihtml}
+
+        {doc_minihtml}
+    """
+
+
+class PgPepShowDocCommand(sublime_plugin.TextCommand):
+    def run(self, edit, show="popup"):
+        view_ = self.view
+        view_id_ = self.view.id()
+        view_sel_ = [region for region in self.view.sel()]
+        window_ = self.view.window()
+
+        def done_(minihtmls):
+            if not minihtmls:
+                return
 
-        if minihtmls:
             content = f"""
             <body id='pg-pep-show-doc'>
 
@@ -3139,20 +6747,96 @@ class PgPepShowDocCommand(sublime_plugin.TextCommand):
             """
 
             if show == "popup":
-                self.view.show_popup(
+                view_.show_popup(
                     content,
                     location=-1,
                     max_width=500,
                 )
 
             elif show == "side_by_side":
-                sheet = self.view.window().new_html_sheet(
+                sheet = window_.new_html_sheet(
                     "Documentation",
                     content,
                     sublime.SEMI_TRANSIENT | sublime.ADD_TO_SELECTION,
                 )
 
-                self.view.window().focus_sheet(sheet)
+                window_.focus_sheet(sheet)
+
+        # Documentation of thingy under the cursor might have been prefetched.
+        if (docs := prefetched(view_, view_sel_, "doc")) is not None:
+            done_([doc for doc in docs if doc])
+            return
+
+        def run_(task):
+            view_analysis_ = view_analysis(view_id_)
+
+            project_path_ = project_path(window_)
+
+            paths_definitions_ = paths_definitions(project_path_)
+
+            classpath_analysis_ = classpath_analysis(project_path_)
+
+            minihtmls = []
+
+            for region in view_sel_:
+                if task.is_cancelled():
+                    break
+
+                if thingy := thingy_at(view_, view_analysis_, region):
+                    if definition := resolve_doc_definition(
+                        view_analysis_,
+                        paths_definitions_,
+                        classpath_analysis_,
+                        thingy,
+                    ):
+                        minihtmls.append(definition_doc_minihtml(definition))
+
+            return minihtmls
+
+        run_task(window_, run_, done_, view=view_)
+
+
+class PgPepAproposCommand(sublime_plugin.WindowCommand):
+    """
+    Search names, arglists and docs of Vars and namespaces in paths and classpath.
+
+    See `DocIndex`.
+    """
+
+    def input(self, args):
+        if "query" not in args:
+            return QueryInputHandler("Apropos")
+
+    def run(self, query):
+        window_ = self.window
+        project_path_ = project_path(window_)
+        limit_ = apropos_max_items(window_)
+
+        def run_(task):
+            return search_docs(project_path_, query, limit_)
+
+        def done_(definitions):
+            if not definitions:
+                window_.status_message(f"Pep: No matches for '{query}'")
+                return
+
+            content = f"""
+            <body id='pg-pep-apropos'>
+
+                {"<br/>".join(definition_doc_minihtml(definition) for definition in definitions)}
+
+            </body>
+            """
+
+            sheet = window_.new_html_sheet(
+                f"Apropos: {query}",
+                content,
+                sublime.SEMI_TRANSIENT,
+            )
+
+            window_.focus_sheet(sheet)
+
+        run_task(window_, run_, done_)
 
 
 class PgPepJumpCommand(sublime_plugin.TextCommand):
@@ -3409,38 +7093,30 @@ class PgPepGotoAnythingInClasspathCommand(sublime_plugin.WindowCommand):
 
         project_path_ = project_path(self.window)
 
-        def done_(thingy_list):
-            progress.stop()
+        quick_panel_item_opts = GOTO_ANYTHING_QUICK_PANEL_ITEM_OPTS
 
-            goto_thingy(
-                window_,
-                thingy_list,
-                goto_on_highlight=goto_on_highlight,
-                goto_side_by_side=goto_side_by_side,
-                quick_panel_item_opts={
-                    "show_namespace": True,
-                    "show_row_col": False,
-                },
-            )
+        def done_(goto_list_):
+            if goto_list_:
+                thingy_list, quick_panel_items = goto_list_
 
-        def run_():
-            classpath_analysis_ = classpath_analysis(project_path_, not_found={})
+                goto_thingy(
+                    window_,
+                    thingy_list,
+                    goto_on_highlight=goto_on_highlight,
+                    goto_side_by_side=goto_side_by_side,
+                    quick_panel_item_opts=quick_panel_item_opts,
+                    quick_panel_items=quick_panel_items,
+                )
 
-            thingy_list = thingy_dedupe(
-                [
-                    *namespace_definitions(classpath_analysis_),
-                    *var_definitions(classpath_analysis_),
-                    *keyword_regs(classpath_analysis_),
-                ],
+        def run_(task):
+            return goto_list(
+                project_path_,
+                "classpath",
+                "anything",
+                quick_panel_item_opts,
             )
 
-            thingy_list = sorted(thingy_list, key=thingy_name)
-
-            sublime.set_timeout(lambda: done_(thingy_list), 0)
-
-        progress.start("")
-
-        threading.Thread(target=run_).start()
+        run_task(window_, run_, done_)
 
 
 class PgPepGotoAnythingInViewPathsCommand(sublime_plugin.WindowCommand):
@@ -3454,49 +7130,41 @@ class PgPepGotoAnythingInViewPathsCommand(sublime_plugin.WindowCommand):
         goto_side_by_side=False,
     ):
         active_view_ = self.window.active_view()
-        active_view_id_ = self.window.active_view().id()
         window_ = self.window
 
-        def done_(thingy_list):
-            progress.stop()
-
-            goto_thingy(
-                window_,
-                thingy_list,
-                goto_on_highlight=goto_on_highlight,
-                goto_side_by_side=goto_side_by_side,
-                quick_panel_item_opts={
-                    "show_namespace": True,
-                    "show_row_col": False,
-                },
-            )
-
-        def run_():
-            view_analysis_ = (
-                view_analysis(active_view_id_, not_found=None) if active_view_ else None
-            )
+        quick_panel_item_opts = GOTO_ANYTHING_QUICK_PANEL_ITEM_OPTS
 
-            project_path_ = project_path(window_)
+        def done_(goto_list_):
+            if goto_list_:
+                thingy_list, quick_panel_items = goto_list_
 
-            paths_analysis_ = paths_analysis(project_path_, not_found=None)
+                goto_thingy(
+                    window_,
+                    thingy_list,
+                    goto_on_highlight=goto_on_highlight,
+                    goto_side_by_side=goto_side_by_side,
+                    quick_panel_item_opts=quick_panel_item_opts,
+                    quick_panel_items=quick_panel_items,
+                )
 
-            analysis_ = paths_analysis_ or view_analysis_ or {}
+        def run_(task):
+            if goto_list_ := goto_list(
+                project_path(window_),
+                "paths",
+                "anything",
+                quick_panel_item_opts,
+            ):
+                return goto_list_
 
-            thingy_list = thingy_dedupe(
-                [
-                    *namespace_definitions(analysis_),
-                    *var_definitions(analysis_),
-                    *keyword_regs(analysis_),
-                ],
+            view_analysis_ = (
+                view_analysis(active_view_.id(), not_found=None)
+                if active_view_
+                else None
             )
 
-            thingy_list = sorted(thingy_list, key=thingy_name)
-
-            sublime.set_timeout(lambda: done_(thingy_list), 0)
+            return goto_anything_list(view_analysis_ or {}), None
 
-        progress.start("")
-
-        threading.Thread(target=run_).start()
+        run_task(window_, run_, done_)
 
 
 class PgPepGotoAnythingInViewCommand(sublime_plugin.TextCommand):
@@ -3548,24 +7216,38 @@ class PgPepGotoKeywordInClasspathCommand(sublime_plugin.WindowCommand):
         show_filename=True,
         show_row_col=False,
     ):
+        window_ = self.window
+
         project_path_ = project_path(self.window)
 
-        if classpath_analysis_ := classpath_analysis(project_path_, not_found=None):
-            thingy_list = thingy_dedupe(keyword_regs(classpath_analysis_))
+        quick_panel_item_opts = {
+            "show_row_col": show_row_col,
+            "show_filename": show_filename,
+        }
 
-            thingy_list = sorted(thingy_list, key=thingy_name)
+        def done_(goto_list_):
+            if goto_list_:
+                thingy_list, quick_panel_items = goto_list_
 
-            goto_thingy(
-                self.window,
-                thingy_list,
-                goto_on_highlight=goto_on_highlight,
-                goto_side_by_side=goto_side_by_side,
-                quick_panel_item_opts={
-                    "show_row_col": show_row_col,
-                    "show_filename": show_filename,
-                },
+                goto_thingy(
+                    window_,
+                    thingy_list,
+                    goto_on_highlight=goto_on_highlight,
+                    goto_side_by_side=goto_side_by_side,
+                    quick_panel_item_opts=quick_panel_item_opts,
+                    quick_panel_items=quick_panel_items,
+                )
+
+        def run_(task):
+            return goto_list(
+                project_path_,
+                "classpath",
+                "keyword",
+                quick_panel_item_opts,
             )
 
+        run_task(window_, run_, done_)
+
 
 class PgPepGotoKeywordInViewPathsCommand(sublime_plugin.WindowCommand):
     """
@@ -3579,31 +7261,46 @@ class PgPepGotoKeywordInViewPathsCommand(sublime_plugin.WindowCommand):
         show_filename=False,
         show_row_col=False,
     ):
-        active_view = self.window.active_view()
-
-        view_analysis_ = (
-            view_analysis(active_view.id(), not_found=None) if active_view else None
-        )
+        active_view_ = self.window.active_view()
+        window_ = self.window
 
         project_path_ = project_path(self.window)
 
-        paths_analysis_ = paths_analysis(project_path_, not_found=None)
+        quick_panel_item_opts = {
+            "show_row_col": show_row_col,
+            "show_filename": show_filename,
+        }
+
+        def done_(goto_list_):
+            if goto_list_:
+                thingy_list, quick_panel_items = goto_list_
+
+                goto_thingy(
+                    window_,
+                    thingy_list,
+                    goto_on_highlight=goto_on_highlight,
+                    goto_side_by_side=goto_side_by_side,
+                    quick_panel_item_opts=quick_panel_item_opts,
+                    quick_panel_items=quick_panel_items,
+                )
 
-        if analysis_ := paths_analysis_ or view_analysis_:
-            thingy_list = thingy_dedupe(keyword_regs(analysis_))
+        def run_(task):
+            if goto_list_ := goto_list(
+                project_path_,
+                "paths",
+                "keyword",
+                quick_panel_item_opts,
+            ):
+                return goto_list_
 
-            thingy_list = sorted(thingy_list, key=thingy_name)
+            if view_analysis_ := (
+                view_analysis(active_view_.id(), not_found=None)
+                if active_view_
+                else None
+            ):
+                return goto_keyword_list(view_analysis_), None
 
-            goto_thingy(
-                self.window,
-                thingy_list,
-                goto_on_highlight=goto_on_highlight,
-                goto_side_by_side=goto_side_by_side,
-                quick_panel_item_opts={
-                    "show_row_col": show_row_col,
-                    "show_filename": show_filename,
-                },
-            )
+        run_task(window_, run_, done_)
 
 
 class PgPepGotoNamespaceInClasspathCommand(sublime_plugin.WindowCommand):
@@ -3622,31 +7319,33 @@ class PgPepGotoNamespaceInClasspathCommand(sublime_plugin.WindowCommand):
 
         project_path_ = project_path(self.window)
 
-        def done_(thingy_list):
-            progress.stop()
-
-            goto_thingy(
-                window_,
-                thingy_list,
-                goto_on_highlight=goto_on_highlight,
-                goto_side_by_side=goto_side_by_side,
-                quick_panel_item_opts={
-                    "show_filename": show_filename,
-                    "show_row_col": show_row_col,
-                },
-            )
-
-        def run_():
-            analysis_ = classpath_analysis(project_path_, not_found={})
+        quick_panel_item_opts = {
+            "show_filename": show_filename,
+            "show_row_col": show_row_col,
+        }
 
-            thingy_list = thingy_dedupe(namespace_definitions(analysis_))
-            thingy_list = sorted(thingy_list, key=thingy_name)
+        def done_(goto_list_):
+            if goto_list_:
+                thingy_list, quick_panel_items = goto_list_
 
-            sublime.set_timeout(lambda: done_(thingy_list), 0)
+                goto_thingy(
+                    window_,
+                    thingy_list,
+                    goto_on_highlight=goto_on_highlight,
+                    goto_side_by_side=goto_side_by_side,
+                    quick_panel_item_opts=quick_panel_item_opts,
+                    quick_panel_items=quick_panel_items,
+                )
 
-        progress.start("")
+        def run_(task):
+            return goto_list(
+                project_path_,
+                "classpath",
+                "namespace",
+                quick_panel_item_opts,
+            )
 
-        threading.Thread(target=run_).start()
+        run_task(window_, run_, done_)
 
 
 class PgPepGotoNamespaceInViewPathsCommand(sublime_plugin.WindowCommand):
@@ -3663,33 +7362,35 @@ class PgPepGotoNamespaceInViewPathsCommand(sublime_plugin.WindowCommand):
     ):
         window_ = self.window
 
-        project_path_ = project_path(self.window)
-
-        def done_(thingy_list):
-            progress.stop()
-
-            goto_thingy(
-                window_,
-                thingy_list,
-                goto_on_highlight=goto_on_highlight,
-                goto_side_by_side=goto_side_by_side,
-                quick_panel_item_opts={
-                    "show_filename": show_filename,
-                    "show_row_col": show_row_col,
-                },
-            )
-
-        def run_():
-            analysis_ = paths_analysis(project_path_, not_found={})
+        project_path_ = project_path(self.window)
+
+        quick_panel_item_opts = {
+            "show_filename": show_filename,
+            "show_row_col": show_row_col,
+        }
 
-            thingy_list = thingy_dedupe(namespace_definitions(analysis_))
-            thingy_list = sorted(thingy_list, key=thingy_name)
+        def done_(goto_list_):
+            if goto_list_:
+                thingy_list, quick_panel_items = goto_list_
 
-            sublime.set_timeout(lambda: done_(thingy_list), 0)
+                goto_thingy(
+                    window_,
+                    thingy_list,
+                    goto_on_highlight=goto_on_highlight,
+                    goto_side_by_side=goto_side_by_side,
+                    quick_panel_item_opts=quick_panel_item_opts,
+                    quick_panel_items=quick_panel_items,
+                )
 
-        progress.start("")
+        def run_(task):
+            return goto_list(
+                project_path_,
+                "paths",
+                "namespace",
+                quick_panel_item_opts,
+            )
 
-        threading.Thread(target=run_).start()
+        run_task(window_, run_, done_)
 
 
 class PgPepGotoDefinitionCommand(sublime_plugin.TextCommand):
@@ -3707,12 +7408,10 @@ class PgPepGotoDefinitionCommand(sublime_plugin.TextCommand):
     ):
         view_ = self.view
         view_id_ = self.view.id()
-        view_sel_ = self.view.sel()
+        view_sel_ = [region for region in self.view.sel()]
         window_ = self.view.window()
 
         def done_(thingy_definitions):
-            progress.stop()
-
             if not thingy_definitions:
                 return
 
@@ -3750,52 +7449,46 @@ class PgPepGotoDefinitionCommand(sublime_plugin.TextCommand):
                     },
                 )
 
-        def run_():
-            project_path_ = project_path(window_)
-
-            def paths_analysis_delay():
-                analysis = None
-
-                def f():
-                    nonlocal analysis
-                    if analysis is None:
-                        analysis = paths_analysis(project_path_)
-                    return analysis
+        # Definitions of thingy under the cursor might have been prefetched.
+        if (definitions := prefetched(view_, view_sel_, "definitions")) is not None:
+            done_(
+                [
+                    definition
+                    for definitions_ in definitions
+                    if definitions_
+                    for definition in definitions_
+                ]
+            )
+            return
 
-                return f
+        def run_(task):
+            project_path_ = project_path(window_)
 
             view_analysis_ = view_analysis(view_id_)
 
             classpath_analysis_ = classpath_analysis(project_path_)
 
-            paths_analysis_ = paths_analysis_delay()
+            paths_definitions_ = paths_definitions(project_path_)
 
             # Store usages of Thingy at region(s).
             thingy_definitions_ = []
 
             for region in view_sel_:
+                if task.is_cancelled():
+                    break
+
                 if thingy := thingy_at(view_, view_analysis_, region):
-                    if (
-                        thingy_definitions := find_definitions(
-                            analysis=view_analysis_,
-                            thingy=thingy,
-                        )
-                        or find_definitions(
-                            analysis=paths_analysis_(),
-                            thingy=thingy,
-                        )
-                        or find_definitions(
-                            analysis=classpath_analysis_,
-                            thingy=thingy,
-                        )
+                    if thingy_definitions := resolve_definitions(
+                        view_analysis_,
+                        paths_definitions_,
+                        classpath_analysis_,
+                        thingy,
                     ):
                         thingy_definitions_.extend(thingy_definitions)
 
-            sublime.set_timeout(lambda: done_(thingy_definitions_), 0)
+            return thingy_definitions_
 
-        progress.start("")
-
-        threading.Thread(target=run_).start()
+        run_task(window_, run_, done_, view=view_)
 
 
 class PgPepGotoNamespaceUsageInViewCommand(sublime_plugin.TextCommand):
@@ -3895,122 +7588,484 @@ class PgPepGotoRequireImportInViewCommand(sublime_plugin.TextCommand):
         try:
             view_analysis_ = view_analysis(self.view.id())
 
-            cursor_region = self.view.sel()[0]
+            cursor_region = self.view.sel()[0]
+
+            if thingy := thingy_at(self.view, view_analysis_, cursor_region):
+                if cursor_namespace_usage := thingy.get("to"):
+                    nindex_usages = analysis_nindex_usages(view_analysis_)
+
+                    if namespace_usages := nindex_usages.get(cursor_namespace_usage):
+                        # Goto first usage only.
+                        # TODO: Show a QuickPanel if there are multiple options.
+                        goto(self.view.window(), thingy_location(namespace_usages[0]))
+
+                elif cursor_class_usage := thingy.get("class"):
+                    jindex_usages = analysis_jindex_usages(view_analysis_)
+
+                    if class_usages := jindex_usages.get(cursor_class_usage):
+                        # Goto first usage only.
+                        # TODO: Show a QuickPanel if there are multiple options.
+                        goto(self.view.window(), thingy_location(class_usages[0]))
+
+        except Exception:
+            print("Pep: Error: PgPepGotoRequireImportCommand", traceback.format_exc())
+
+
+def goto_thingy_usage(
+    window,
+    thingy_usages,
+    goto_on_highlight=False,
+    goto_side_by_side=False,
+    group_by_file=False,
+):
+    if not thingy_usages:
+        return
+
+    thingy_usages_ = thingy_dedupe(thingy_usages)
+
+    if len(thingy_usages_) == 1:
+        location = thingy_location(thingy_usages_[0])
+
+        goto(
+            window,
+            location,
+            GOTO_SIDE_BY_SIDE_FLAGS if goto_side_by_side else GOTO_DEFAULT_FLAGS,
+        )
+
+    else:
+        thingy_usages_sorted = sorted(
+            thingy_usages_,
+            key=lambda thingy_usage: [
+                thingy_usage.get("filename"),
+                thingy_usage.get("row"),
+                thingy_usage.get("col"),
+            ],
+        )
+
+        # TODO: Quick Panel Item options per semantic.
+
+        goto_thingy(
+            window,
+            thingy_usages_sorted,
+            goto_on_highlight=goto_on_highlight,
+            goto_side_by_side=goto_side_by_side,
+            quick_panel_item_opts={
+                "show_namespace": True,
+                "show_row_col": True,
+                "show_filename": False,
+            },
+            group_by_file=group_by_file,
+        )
+
+
+class PgPepGotoUsageCommand(sublime_plugin.TextCommand):
+    def run(
+        self,
+        edit,
+        goto_on_highlight=False,
+        goto_side_by_side=False,
+        group_by_file=False,
+    ):
+        view_ = self.view
+        view_id_ = self.view.id()
+        view_sel_ = [region for region in self.view.sel()]
+        window_ = self.view.window()
+
+        def done_(thingy_usages):
+            goto_thingy_usage(
+                window_,
+                thingy_usages,
+                goto_on_highlight=goto_on_highlight,
+                goto_side_by_side=goto_side_by_side,
+                group_by_file=group_by_file,
+            )
+
+        def run_(task):
+            view_analysis_ = view_analysis(view_id_)
+
+            project_path_ = project_path(window_)
+
+            paths_analysis_ = paths_analysis(project_path_)
+
+            # Store usages of Thingy at region(s).
+            thingy_usages_ = []
+
+            for region in view_sel_:
+                if task.is_cancelled():
+                    break
+
+                if thingy := thingy_at(view_, view_analysis_, region):
+                    if thingy_usages := find_usages(
+                        analysis=paths_analysis_,
+                        thingy=thingy,
+                    ) or find_usages(
+                        analysis=view_analysis_,
+                        thingy=thingy,
+                    ):
+                        thingy_usages_.extend(thingy_usages)
+
+            return thingy_usages_
+
+        run_task(window_, run_, done_, view=view_)
+
+
+class PgPepShowCallHierarchyCommand(sublime_plugin.TextCommand):
+    """
+    Show callers, or callees, of the Var under the cursor - several levels deep.
+
+    Direction is either "callers" or "callees".
+
+    See `CallGraph`.
+    """
+
+    def run(self, edit, direction="callers", goto_on_highlight=True):
+        view_ = self.view
+        view_id_ = self.view.id()
+        view_sel_ = [region for region in self.view.sel()]
+        window_ = self.view.window()
+        depth_ = call_hierarchy_depth(window_)
+
+        def done_(result):
+            if not result or not result[0]:
+                window_.status_message(f"Pep: No {direction}")
+                return
+
+            thingy_list, quick_panel_items = result
+
+            goto_thingy(
+                window_,
+                thingy_list,
+                goto_on_highlight=goto_on_highlight,
+                quick_panel_items=quick_panel_items,
+            )
+
+        def run_(task):
+            view_analysis_ = view_analysis(view_id_)
+
+            project_path_ = project_path(window_)
+
+            if not (graph := call_graph(project_path_)):
+                return None
+
+            if not view_sel_:
+                return None
+
+            thingy = thingy_at(view_, view_analysis_, view_sel_[0])
+
+            if not thingy:
+                return None
+
+            if thingy["_semantic"] == TT_VAR_DEFINITION:
+                var = (thingy.get("ns"), thingy.get("name"))
+
+            elif thingy["_semantic"] == TT_VAR_USAGE:
+                var = (thingy.get("to"), thingy.get("name"))
+
+            else:
+                return None
+
+            paths_definitions_ = paths_definitions(project_path_)
+
+            classpath_analysis_ = classpath_analysis(project_path_)
+
+            thingy_list = []
+
+            quick_panel_items = []
+
+            for level, (ns, name), usages in graph.hierarchy(var, direction, depth_):
+                if task.is_cancelled():
+                    return None
+
+                usages = sorted(
+                    usages,
+                    key=lambda usage: (usage.get("filename"), usage.get("row")),
+                )
+
+                # Callers are shown at their call site, callees at their definition.
+                location_thingy = usages[0]
+
+                if direction == "callees":
+                    callee_usage = usages[0]
+
+                    location_thingy = (
+                        find_var_definition(paths_definitions_, callee_usage)
+                        or find_var_definition(classpath_analysis_, callee_usage)
+                        or callee_usage
+                    )
+
+                thingy_list.append(location_thingy)
+
+                quick_panel_items.append(
+                    sublime.QuickPanelItem(
+                        f"{'    ' * (level - 1)}{ns}/{name}",
+                        details=location_thingy.get("filename", ""),
+                        annotation=f"{len(usages)} usage(s)",
+                        kind=sublime.KIND_FUNCTION,
+                    )
+                )
+
+            return (thingy_list, quick_panel_items)
+
+        run_task(window_, run_, done_, view=view_)
+
+
+class PgPepShowNamespaceDependenciesCommand(sublime_plugin.TextCommand):
+    """
+    Show namespaces which the namespace in view requires, and namespaces which require it - transitively.
+
+    Namespaces are listed in topological order; direct dependencies and dependents first.
+
+    See `NamespaceGraph`.
+    """
+
+    def run(self, edit, goto_on_highlight=True):
+        view_ = self.view
+        view_id_ = self.view.id()
+        view_file_name_ = self.view.file_name()
+        window_ = self.view.window()
+
+        def done_(result):
+            if not result or not result[0]:
+                window_.status_message("Pep: No dependencies or dependents")
+                return
+
+            thingy_list, quick_panel_items = result
+
+            goto_thingy(
+                window_,
+                thingy_list,
+                goto_on_highlight=goto_on_highlight,
+                quick_panel_items=quick_panel_items,
+            )
+
+        def run_(task):
+            view_analysis_ = view_analysis(view_id_)
+
+            project_path_ = project_path(window_)
+
+            if not (graph := namespace_graph(project_path_)):
+                return None
+
+            namespace_definitions_ = namespace_definitions(view_analysis_)
+
+            if not namespace_definitions_:
+                return None
+
+            namespace = namespace_definitions_[0].get("name")
+
+            paths_definitions_ = paths_definitions(project_path_)
+
+            classpath_analysis_ = classpath_analysis(project_path_)
+
+            position = {
+                namespace_: i for i, namespace_ in enumerate(graph.topological_order())
+            }
+
+            thingy_list = []
+
+            quick_panel_items = []
+
+            for direction in ["dependencies", "dependents"]:
+                distances = graph.closure([namespace], direction)
+
+                for namespace_ in sorted(
+                    distances,
+                    key=lambda namespace_: (
+                        distances[namespace_] > 1,
+                        position.get(namespace_, 0),
+                    ),
+                ):
+                    if task.is_cancelled():
+                        return None
+
+                    namespace_usage = {"to": namespace_, "filename": view_file_name_}
+
+                    # Namespaces without a definition, e.g. Java packages, are not listed.
+                    if definition := find_namespace_definition(
+                        paths_definitions_, namespace_usage
+                    ) or find_namespace_definition(
+                        classpath_analysis_, namespace_usage
+                    ):
+                        annotation = (
+                            "Dependency" if direction == "dependencies" else "Dependent"
+                        )
+
+                        if distances[namespace_] > 1:
+                            annotation += " (transitive)"
+
+                        thingy_list.append(definition)
+
+                        quick_panel_items.append(
+                            sublime.QuickPanelItem(
+                                namespace_,
+                                details=definition.get("filename", ""),
+                                annotation=annotation,
+                                kind=thingy_kind(TT_NAMESPACE_DEFINITION, definition),
+                            )
+                        )
+
+            return (thingy_list, quick_panel_items)
+
+        run_task(window_, run_, done_, view=view_)
+
+
+class PgPepUnusedVarsCommand(sublime_plugin.WindowCommand):
+    """
+    Show public Vars in paths which are not used anywhere in paths.
+
+    See `UsageCountIndex`.
+    """
+
+    def run(self, goto_on_highlight=True):
+        window_ = self.window
+
+        def done_(unused):
+            if not unused:
+                window_.status_message("Pep: No unused Vars")
+                return
+
+            goto_thingy(
+                window_,
+                unused,
+                goto_on_highlight=goto_on_highlight,
+                quick_panel_item_opts={
+                    "show_namespace": True,
+                    "show_filename": True,
+                    "show_row_col": False,
+                },
+            )
+
+        def run_(task):
+            if usage_count_index_ := usage_count_index(project_path(window_)):
+                return usage_count_index_.unused()
+
+        run_task(window_, run_, done_)
+
+
+class PgPepProjectDiagnosticsCommand(sublime_plugin.WindowCommand):
+    """
+    Show warnings and errors of files in paths in the output panel - grouped by file.
+
+    Only files which changed since the last run are linted - see `lint_paths`.
+    """
+
+    def run(self):
+        window_ = self.window
+
+        def done_(findings):
+            panel = output_panel(window_)
+            panel.settings().set("gutter", False)
+            panel.settings().set(
+                "result_file_regex", r"^- (.*?):([0-9]+):([0-9]+) (.*)$"
+            )
+            panel.settings().set(
+                "result_line_regex", r"^- (.*?):([0-9]+):([0-9]+) (.*)$"
+            )
+            panel.settings().set("highlight_line", False)
+            panel.settings().set("line_numbers", False)
+            panel.settings().set("scroll_past_end", False)
 
-            if thingy := thingy_at(self.view, view_analysis_, cursor_region):
-                if cursor_namespace_usage := thingy.get("to"):
-                    nindex_usages = analysis_nindex_usages(view_analysis_)
+            errors = sum(1 for finding in findings if finding["level"] == "error")
 
-                    if namespace_usages := nindex_usages.get(cursor_namespace_usage):
-                        # Goto first usage only.
-                        # TODO: Show a QuickPanel if there are multiple options.
-                        goto(self.view.window(), thingy_location(namespace_usages[0]))
+            warnings = sum(1 for finding in findings if finding["level"] == "warning")
 
-                elif cursor_class_usage := thingy.get("class"):
-                    jindex_usages = analysis_jindex_usages(view_analysis_)
+            lines = [f"Diagnostics: {errors} error(s), {warnings} warning(s)"]
 
-                    if class_usages := jindex_usages.get(cursor_class_usage):
-                        # Goto first usage only.
-                        # TODO: Show a QuickPanel if there are multiple options.
-                        goto(self.view.window(), thingy_location(class_usages[0]))
+            for filename, findings_ in itertools.groupby(
+                findings, key=lambda finding: finding.get("filename")
+            ):
+                lines.extend(["", filename])
 
-        except Exception:
-            print("Pep: Error: PgPepGotoRequireImportCommand", traceback.format_exc())
+                for finding in findings_:
+                    lines.append(
+                        f"- {filename}:{finding.get('row')}:{finding.get('col')} "
+                        f"{finding.get('level')}: {finding.get('message')}"
+                    )
 
+            panel.set_read_only(False)
+            panel.run_command("select_all")
+            panel.run_command("left_delete")
+            panel.run_command(
+                "append", {"characters": "\n".join(lines), "force": True}
+            )
+            panel.set_read_only(True)
 
-def goto_thingy_usage(
-    window,
-    thingy_usages,
-    goto_on_highlight=False,
-    goto_side_by_side=False,
-):
-    if not thingy_usages:
-        return
+            show_output_panel(window_)
 
-    thingy_usages_ = thingy_dedupe(thingy_usages)
+        def run_(task):
+            return lint_paths(window_)
 
-    if len(thingy_usages_) == 1:
-        location = thingy_location(thingy_usages_[0])
+        run_task(window_, run_, done_)
 
-        goto(
-            window,
-            location,
-            GOTO_SIDE_BY_SIDE_FLAGS if goto_side_by_side else GOTO_DEFAULT_FLAGS,
-        )
 
-    else:
-        thingy_usages_sorted = sorted(
-            thingy_usages_,
-            key=lambda thingy_usage: [
-                thingy_usage.get("filename"),
-                thingy_usage.get("row"),
-                thingy_usage.get("col"),
-            ],
-        )
+class PgPepAffectedTestsCommand(sublime_plugin.WindowCommand):
+    """
+    Show test namespaces affected by unsaved files, and by files saved since it was last run.
 
-        # TODO: Quick Panel Item options per semantic.
+    The form to run affected tests is copied to the clipboard.
 
-        goto_thingy(
-            window,
-            thingy_usages_sorted,
-            goto_on_highlight=goto_on_highlight,
-            goto_side_by_side=goto_side_by_side,
-            quick_panel_item_opts={
-                "show_namespace": True,
-                "show_row_col": True,
-                "show_filename": False,
-            },
-        )
+    See `affected_test_namespaces`.
+    """
 
+    def run(self, reset=True):
+        window_ = self.window
 
-class PgPepGotoUsageCommand(sublime_plugin.TextCommand):
-    def run(
-        self,
-        edit,
-        goto_on_highlight=False,
-        goto_side_by_side=False,
-    ):
-        view_ = self.view
-        view_id_ = self.view.id()
-        view_sel_ = self.view.sel()
-        window_ = self.view.window()
+        if not (project_path_ := project_path(window_)):
+            return
 
-        def done_(thingy_usages):
-            progress.stop()
+        # Filenames in the project index are canonical - see `CLJ_KONDO_OUTPUT_JSON_CONFIG`.
+        filenames = {
+            os.path.realpath(view.file_name())
+            for view in window_.views()
+            if view.is_dirty() and view.file_name()
+        }
 
-            goto_thingy_usage(
-                window_,
-                thingy_usages,
-                goto_on_highlight=goto_on_highlight,
-                goto_side_by_side=goto_side_by_side,
-            )
+        filenames.update(_saved_files_.get(project_path_, set()))
 
-        def run_():
-            view_analysis_ = view_analysis(view_id_)
+        if reset:
+            _saved_files_.pop(project_path_, None)
 
-            project_path_ = project_path(window_)
+        namespaces = affected_test_namespaces(
+            project_path_,
+            filenames,
+            test_namespace_pattern(window_),
+        )
 
-            paths_analysis_ = paths_analysis(project_path_)
+        if not namespaces:
+            window_.status_message("Pep: No affected tests")
+            return
 
-            # Store usages of Thingy at region(s).
-            thingy_usages_ = []
+        run_tests_form = "(clojure.test/run-tests {})".format(
+            " ".join(f"'{namespace}" for namespace in namespaces)
+        )
 
-            for region in view_sel_:
-                if thingy := thingy_at(view_, view_analysis_, region):
-                    if thingy_usages := find_usages(
-                        analysis=paths_analysis_,
-                        thingy=thingy,
-                    ) or find_usages(
-                        analysis=view_analysis_,
-                        thingy=thingy,
-                    ):
-                        thingy_usages_.extend(thingy_usages)
+        sublime.set_clipboard(run_tests_form)
 
-            sublime.set_timeout(lambda: done_(thingy_usages_), 0)
+        panel = output_panel(window_)
+        panel.settings().set("gutter", False)
+        panel.settings().set("line_numbers", False)
 
-        progress.start("")
+        panel.set_read_only(False)
+        panel.run_command("select_all")
+        panel.run_command("left_delete")
+        panel.run_command(
+            "append",
+            {
+                "characters": "\n".join(
+                    [
+                        f"Affected Tests ({len(namespaces)}) - run form copied to the clipboard",
+                        "",
+                        *[f"- {namespace}" for namespace in namespaces],
+                        "",
+                        run_tests_form,
+                    ]
+                ),
+                "force": True,
+            },
+        )
+        panel.set_read_only(True)
 
-        threading.Thread(target=run_).start()
+        show_output_panel(window_)
 
 
 class PgPepGotoUsageInViewCommand(sublime_plugin.TextCommand):
@@ -4041,57 +8096,37 @@ class PgPepGotoUsageInViewCommand(sublime_plugin.TextCommand):
         )
 
 
-class PgPepFindUsagesCommand(sublime_plugin.TextCommand):
-    def run(self, edit):
-        view_analysis_ = view_analysis(self.view.id())
-
-        project_path_ = project_path(self.view.window())
-
-        paths_analysis_ = paths_analysis(project_path_)
+class PgPepReplaceLineCommand(sublime_plugin.TextCommand):
+    """
+    Replace the line at `point` with `characters`.
 
-        # Mapping of Thingy's name to its usages.
-        thingy_name_to_usages = {}
+    It's used to update Find Usages headers in the output panel.
+    """
 
-        for region in self.view.sel():
-            if thingy := thingy_at(self.view, view_analysis_, region):
-                thingy_usages = find_usages(
-                    analysis=paths_analysis_,
-                    thingy=thingy,
-                ) or find_usages(
-                    analysis=view_analysis_,
-                    thingy=thingy,
-                )
+    def run(self, edit, point, characters):
+        self.view.replace(edit, self.view.line(point), characters)
 
-                thingy_name_to_usages[thingy_name(thingy)] = thingy_usages or []
 
-        usages_content = []
+def find_usages_header(thingy_name_, count, searching=False):
+    status = f"{count}, searching..." if searching else f"{count}"
 
-        for thingy_name_, thingy_usages_ in thingy_name_to_usages.items():
-            thingy_usages_ = thingy_dedupe(thingy_usages_)
+    return f"Find Usages: {thingy_name_} ({status})"
 
-            thingy_usages_sorted = sorted(
-                thingy_usages_,
-                key=lambda thingy_usage: [
-                    thingy_usage.get("filename"),
-                    thingy_usage.get("row"),
-                    thingy_usage.get("col"),
-                ],
-            )
 
-            name_usages_content = []
+class PgPepFindUsagesCommand(sublime_plugin.TextCommand):
+    """
+    Find usages of thingies under the cursor.
 
-            for thingy_usage in thingy_usages_sorted:
-                if location := thingy_location(thingy_usage):
-                    name_usages_content.append(
-                        f'- {location.get("filename")}:{location.get("line")}:{location.get("column")}'
-                    )
+    Usages are streamed into the output panel - grouped by file - as they are found.
+    """
 
-            usages_content.append("Find Usages: " + thingy_name_)
-            usages_content.append(
-                "\n".join(name_usages_content) if name_usages_content else "Not found."
-            )
+    def run(self, edit):
+        view_ = self.view
+        view_id_ = self.view.id()
+        view_sel_ = [region for region in self.view.sel()]
+        window_ = self.view.window()
 
-        panel = output_panel(self.view.window())
+        panel = output_panel(window_)
         panel.settings().set("gutter", False)
         panel.settings().set("result_file_regex", r"^- (.*):([0-9]+):([0-9]+)$")
         panel.settings().set("result_line_regex", r"^- (.*):([0-9]+):([0-9]+)$")
@@ -4103,10 +8138,99 @@ class PgPepFindUsagesCommand(sublime_plugin.TextCommand):
         panel.set_read_only(False)
         panel.run_command("select_all")
         panel.run_command("left_delete")
-        panel.run_command("insert", {"characters": "\n\n".join(usages_content)})
         panel.set_read_only(True)
 
-        show_output_panel(self.view.window())
+        show_output_panel(window_)
+
+        # Point of the header of the Thingy being searched.
+        # (It's only read and written on the UI thread.)
+        header_point = 0
+
+        def append_(characters):
+            panel.run_command("append", {"characters": characters, "force": True})
+
+        def begin_(header):
+            nonlocal header_point
+
+            if panel.size():
+                append_("\n\n")
+
+            header_point = panel.size()
+
+            append_(header)
+
+        def update_(header, lines):
+            if lines:
+                append_("\n" + "\n".join(lines))
+
+            panel.set_read_only(False)
+            panel.run_command(
+                "pg_pep_replace_line",
+                {"point": header_point, "characters": header},
+            )
+            panel.set_read_only(True)
+
+        def run_(task):
+            def ui_(f, *args):
+                sublime.set_timeout(
+                    lambda: None if task.is_cancelled() else f(*args), 0
+                )
+
+            view_analysis_ = view_analysis(view_id_)
+
+            project_path_ = project_path(window_)
+
+            # Mapping of Thingy's name to Thingy.
+            thingy_name_to_thingy = {}
+
+            for region in view_sel_:
+                if thingy := thingy_at(view_, view_analysis_, region):
+                    thingy_name_to_thingy[thingy_name(thingy)] = thingy
+
+            for thingy_name_, thingy in thingy_name_to_thingy.items():
+                ui_(begin_, find_usages_header(thingy_name_, 0, searching=True))
+
+                count = 0
+
+                lines = []
+
+                # Flush right after the first file with usages is found,
+                # and then at most once every FIND_USAGES_FLUSH_INTERVAL.
+                flushed_at = 0
+
+                for _, thingy_usages in find_usages_by_file(
+                    project_path_,
+                    view_analysis_,
+                    thingy,
+                ):
+                    if task.is_cancelled():
+                        return
+
+                    for thingy_usage in thingy_usages:
+                        if location := thingy_location(thingy_usage):
+                            lines.append(
+                                f'- {location.get("filename")}:{location.get("line")}:{location.get("column")}'
+                            )
+
+                    count += len(thingy_usages)
+
+                    if time.time() - flushed_at >= FIND_USAGES_FLUSH_INTERVAL:
+                        ui_(
+                            update_,
+                            find_usages_header(thingy_name_, count, searching=True),
+                            lines,
+                        )
+
+                        lines = []
+
+                        flushed_at = time.time()
+
+                if not count:
+                    lines.append("Not found.")
+
+                ui_(update_, find_usages_header(thingy_name_, count), lines)
+
+        run_task(window_, run_, lambda _: None, view=view_)
 
 
 class PgPepSelectCommand(sublime_plugin.TextCommand):
@@ -4255,9 +8379,10 @@ class PgPepViewListener(sublime_plugin.ViewEventListener):
     def __init__(self, view):
         super().__init__(view)
 
-        self.analyzer = None
-        self.highlighter = None
-        self.is_highlight_pending = False
+        self.is_selection_pending = False
+        self.breadcrumb = None
+        self.typing_since = None
+        self.viewport = None
 
     def analyze(self, afs=DEFAULT_VIEW_ANALYSIS_FUNCTIONS):
         analyze_view = True
@@ -4268,38 +8393,217 @@ class PgPepViewListener(sublime_plugin.ViewEventListener):
         if analyze_view:
             analyze_view_async(self.view, afs)
 
-    def highlight(self):
-        self.is_highlight_pending = False
+    def on_selection_settled(self):
+        self.is_selection_pending = False
 
-        highlight_thingy(self.view)
+        window = self.view.window()
+
+        if automatically_highlight(window):
+            highlight_thingy(self.view)
+
+        # Prefetch might extract JAR entries and render docs -
+        # it's not okay to block Sublime's async thread.
+        if prefetch_definitions(window):
+            prefetch_async(self.view)
+
+        if view_status_show_breadcrumb(window):
+            self.update_breadcrumb()
+
+        # Paths might have been analyzed, or moving the cursor might have scrolled the view.
+        annotate_usage_counts(self.view)
+
+        refresh_annotations(self.view)
+
+    def update_breadcrumb(self):
+        """
+        Show the Var enclosing the cursor in the status bar - the status is set only if it changed.
+        """
+        if staled_analysis(self.view) or not (sel := self.view.sel()):
+            return
+
+        row, col = self.view.rowcol(sel[0].begin())
+
+        var_definition = enclosing_var_definition(
+            view_analysis(self.view.id()),
+            row + 1,
+            col + 1,
+        )
+
+        breadcrumb = (
+            f"{var_definition.get('ns')}/{var_definition.get('name')}"
+            if var_definition
+            else ""
+        )
+
+        if breadcrumb != self.breadcrumb:
+            self.breadcrumb = breadcrumb
+
+            self.view.set_status(BREADCRUMB_STATUS_KEY, breadcrumb)
 
     def on_activated_async(self):
         self.analyze()
 
+        # Paths might have been analyzed since the view was active.
+        self.viewport = None
+
+        self.poll_viewport()
+
+    def on_deactivated_async(self):
+        cancel_debounce((self.view.id(), "viewport"))
+
+    def update_viewport(self):
+        """
+        Annotate usage counts, and findings, which are now in, or near, the visible region.
+        """
+        visible_region = self.view.visible_region()
+
+        if visible_region != self.viewport:
+            self.viewport = visible_region
+
+            annotate_usage_counts(self.view)
+
+            refresh_annotations(self.view)
+
+    def poll_viewport(self):
+        """
+        Update viewport every `VIEWPORT_POLL_INTERVAL` while the view is active,
+        and it has annotations which depend on its visible region -
+        scrolling with the mouse wheel, or scrollbar, doesn't trigger any event.
+
+        See `poll_viewport_async`.
+        """
+        if not self.view.is_valid():
+            return
+
+        self.update_viewport()
+
+        if viewport_annotated(self.view):
+            debounce(
+                (self.view.id(), "viewport"),
+                VIEWPORT_POLL_INTERVAL,
+                self.poll_viewport,
+            )
+
     def on_modified_async(self):
-        if self.analyzer:
-            self.analyzer.cancel()
+        now = time.time()
 
-        analysis_delay_ = analysis_delay(self.view.window())
+        # Typing is continuous while modifications are debounced.
+        if self.typing_since is None or (self.view.id(), "analyze") not in _debounce_:
+            self.typing_since = now
 
-        self.analyzer = threading.Timer(analysis_delay_, self.analyze)
-        self.analyzer.start()
+        analysis_delay_ = view_analysis_delay(
+            self.view,
+            typing_seconds=now - self.typing_since,
+        )
+
+        debounce((self.view.id(), "analyze"), analysis_delay_, self.analyze)
 
     def on_selection_modified_async(self):
-        if self.highlighter:
-            self.highlighter.cancel()
+        window = self.view.window()
+
+        if (
+            automatically_highlight(window)
+            or prefetch_definitions(window)
+            or view_status_show_breadcrumb(window)
+            or annotate_usage_counts_enabled(window)
+            or self.view.id() in _annotations_
+        ):
+            interval = 0.3 if self.is_selection_pending else 0.1
+
+            self.is_selection_pending = True
+
+            debounce((self.view.id(), "selection"), interval, self.on_selection_settled)
+
+    def on_hover(self, point, hover_zone):
+        """
+        Show documentation of the hovered symbol.
+
+        Documentation is resolved from data which is already indexed only -
+        prefetched, view and classpath analysis, and paths definitions (see `DefinitionIndex`) -
+        so it's a few lookups, and it never waits for paths analysis.
+        """
+        if hover_zone != sublime.HOVER_TEXT:
+            return
+
+        window = self.view.window()
+
+        if not window or not show_doc_on_hover(window):
+            return
+
+        if staled_analysis(self.view):
+            return
+
+        region = sublime.Region(point, point)
+
+        minihtml = None
+
+        if (prefetched_ := prefetched(self.view, [region], "doc")) is not None:
+            minihtml = prefetched_[0] if prefetched_ else None
+
+        else:
+            view_analysis_ = view_analysis(self.view.id())
+
+            if thingy := thingy_at(self.view, view_analysis_, region):
+                project_path_ = project_path(window)
+
+                if definition := resolve_doc_definition(
+                    view_analysis_,
+                    paths_definitions(project_path_),
+                    classpath_analysis(project_path_),
+                    thingy,
+                ):
+                    minihtml = definition_doc_minihtml(definition)
 
-        if automatically_highlight(self.view.window()):
-            interval = 0.3 if self.is_highlight_pending else 0.1
+        if minihtml:
+            self.view.show_popup(
+                f"<body id='pg-pep-show-doc'>{minihtml}</body>",
+                flags=sublime.HIDE_ON_MOUSE_MOVE_AWAY,
+                location=point,
+                max_width=500,
+            )
+
+    def on_query_completions(self, prefix, locations):
+        window = self.view.window()
+
+        if not window or not show_completions(window):
+            return None
+
+        point = locations[0]
+
+        line = self.view.line(point)
+
+        line_text = self.view.substr(sublime.Region(line.begin(), point))
 
-            self.is_highlight_pending = True
+        if not (token := COMPLETION_TOKEN_REGEX.search(line_text)):
+            return None
 
-            self.highlighter = threading.Timer(interval, self.highlight)
-            self.highlighter.start()
+        items = completions(
+            self.view,
+            view_analysis(self.view.id()),
+            project_path(window),
+            point,
+            token.group(),
+            prefix,
+        )
+
+        return items or None
 
     def on_post_save_async(self):
-        # Include function to annotate view on save (if applicable).
-        self.analyze(afs=[*DEFAULT_VIEW_ANALYSIS_FUNCTIONS, af_annotate_on_save])
+        if (project_path_ := project_path(self.view.window())) and (
+            file_name := self.view.file_name()
+        ):
+            _saved_files_.setdefault(project_path_, set()).add(
+                os.path.realpath(file_name)
+            )
+
+        # Include functions to annotate view, and analyze its dependents, on save (if applicable).
+        self.analyze(
+            afs=[
+                *DEFAULT_VIEW_ANALYSIS_FUNCTIONS,
+                af_annotate_on_save,
+                af_analyze_dependents,
+            ]
+        )
 
     def on_close(self):
         """
@@ -4307,6 +8611,21 @@ class PgPepViewListener(sublime_plugin.ViewEventListener):
         """
         set_view_analysis(self.view.id(), {})
 
+        cancel_debounce((self.view.id(), "analyze"))
+        cancel_debounce((self.view.id(), "selection"))
+        cancel_debounce((self.view.id(), "viewport"))
+
+        _analysis_latency_.pop(self.view.id(), None)
+
+        _prefetch_.pop(self.view.id(), None)
+
+        with _prefetch_lock_:
+            _prefetch_pending_.pop(self.view.id(), None)
+
+        _usage_count_annotations_.pop(self.view.id(), None)
+
+        _annotations_.pop(self.view.id(), None)
+
 
 class PgPepEventListener(sublime_plugin.EventListener):
     """
@@ -4316,6 +8635,8 @@ class PgPepEventListener(sublime_plugin.EventListener):
     """
 
     def on_load_project_async(self, window):
+        clear_settings_snapshot(window)
+
         if setting(window, "analyze_paths_on_load_project", False):
             analyze_paths_async(window)
 
@@ -4334,14 +8655,53 @@ class PgPepEventListener(sublime_plugin.EventListener):
 
             set_classpath_analysis(project_path_, {})
 
+        clear_settings_snapshot(window)
+
+    def on_post_save_async(self, view):
+        # Project's data might have changed - it's reloaded from the project file.
+        if (window := view.window()) and (file_name := view.file_name()):
+            if file_name == window.project_file_name():
+                clear_settings_snapshot(window)
+
+    def on_modified_async(self, view):
+        # Update symbol search as the user types.
+        if view.element() == "command_palette:input":
+            if (window := sublime.active_window()) and _symbol_search_.get(window.id()):
+                query = view_text(view)
+
+                def refresh():
+                    # Refresh only if the user stopped typing.
+                    if view_text(view) == query:
+                        refresh_symbol_search(window, query)
+
+                sublime.set_timeout(refresh, SEARCH_SYMBOLS_DELAY)
+
+    def on_query_context(self, view, key, operator, operand, match_all):
+        if key == "pg_pep_task_running":
+            running = task_running(view.window())
+
+            if operator == sublime.OP_EQUAL:
+                return running == operand
+
+            elif operator == sublime.OP_NOT_EQUAL:
+                return running != operand
+
 
 # ---
 
 
 def plugin_loaded():
+    settings().add_on_change("pg_pep", clear_settings_snapshot)
+
     if window := sublime.active_window():
         if setting(window, "analyze_paths_on_plugin_loaded", False):
             analyze_paths_async(window)
 
         if setting(window, "analyze_classpath_on_plugin_loaded", False):
             analyze_classpath_async(window)
+
+
+def plugin_unloaded():
+    settings().clear_on_change("pg_pep")
+
+    clear_jar_cache()
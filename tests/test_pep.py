@@ -335,3 +335,600 @@ class TestJavaClassAnalysis(TestCase):
         )
 
         view.close()
+
+
+class TestTrigramIndex(TestCase):
+    def var_definition(self, ns, name):
+        return {
+            "_semantic": pep.TT_VAR_DEFINITION,
+            "filename": "-",
+            "row": 1,
+            "col": 1,
+            "ns": ns,
+            "name": name,
+        }
+
+    def test_search(self):
+        index = pep.TrigramIndex()
+
+        index.update(
+            "-",
+            [
+                (pep.thingy_name(thingy), thingy)
+                for thingy in [
+                    self.var_definition("clojure.core", "map"),
+                    self.var_definition("clojure.core", "mapv"),
+                    self.var_definition("clojure.core", "remove"),
+                    self.var_definition("app.map", "xs"),
+                ]
+            ],
+        )
+
+        self.assertEqual(
+            ["clojure.core/map", "clojure.core/mapv", "app.map/xs"],
+            [pep.thingy_name(thingy) for _, thingy in index.search("map")],
+        )
+
+        # Queries shorter than 3 match the beginning of name, or name part.
+        self.assertEqual(
+            ["clojure.core/remove"],
+            [pep.thingy_name(thingy) for _, thingy in index.search("re")],
+        )
+
+        self.assertEqual([], index.search(""))
+
+        # Keywords match without, and rank first with, their leading colon.
+        index.update(
+            "k",
+            [
+                (
+                    ":app.events/init-db",
+                    {"_semantic": pep.TT_KEYWORD, "ns": "app.events", "name": "init-db"},
+                )
+            ],
+        )
+
+        self.assertIn("init-db", [thingy["name"] for _, thingy in index.search("ap")])
+
+        self.assertEqual(
+            ["init-db", "xs"], [thingy["name"] for _, thingy in index.search(":app")]
+        )
+
+        index.update("k", [])
+
+        # Entries are replaced by key.
+        index.update("-", [])
+
+        self.assertEqual([], index.search("map"))
+        self.assertEqual({}, index.postings)
+
+
+class TestPrefixIndex(TestCase):
+    def test_search(self):
+        index = pep.PrefixIndex()
+
+        index.update(
+            "a.clj",
+            [(name, {"name": name}) for name in ["a/c", "a/b", "ab/x", "a/bc"]],
+        )
+
+        self.assertEqual(4, len(index))
+
+        self.assertEqual(["a/b", "a/bc"], [name for name, _ in index.search("a/b")])
+
+        # Names after the range of prefix aren't matched - e.g. 'ab/x' for 'a/'.
+        self.assertEqual(
+            ["a/b", "a/bc", "a/c"],
+            [name for name, _ in index.search("a/")],
+        )
+
+        self.assertEqual(["a/b"], [name for name, _ in index.search("a/b", limit=1)])
+
+        self.assertEqual([], index.search("b"))
+        self.assertEqual([], index.search("ab/y"))
+        self.assertEqual([], index.search("a/bcd"))
+
+        # Entries are replaced by key.
+        index.update("a.clj", [("a/d", {"name": "a/d"})])
+
+        self.assertEqual(["a/d"], [name for name, _ in index.search("a")])
+        self.assertEqual(1, len(index))
+
+
+class TestCompletions(TestCase):
+    def setUp(self):
+        self.project_path = "/pep-test-completions"
+        self.view = scratch_view()
+
+    def tearDown(self):
+        pep.clear_project_index(self.project_path)
+
+        if self.view:
+            self.view.close()
+
+    def var_definition(self, ns, name):
+        return {"filename": "/s.clj", "row": 1, "col": 1, "ns": ns, "name": name}
+
+    def test_completions(self):
+        pep.update_paths_completion_index(
+            self.project_path,
+            {
+                "/s.clj": {
+                    "var-definitions": [
+                        self.var_definition("clojure.string", "blank?"),
+                        self.var_definition("clojure.string", "join"),
+                        self.var_definition("clojure.set", "join"),
+                    ]
+                },
+                "/k.clj": {
+                    "keywords": [
+                        {
+                            "filename": "/k.clj",
+                            "row": 1,
+                            "col": 1,
+                            "ns": "app",
+                            "name": "db",
+                        }
+                    ]
+                },
+            },
+        )
+
+        view_analysis_ = pep.namespace_index(
+            {
+                "namespace-usages": [
+                    {
+                        "filename": "-",
+                        "row": 1,
+                        "col": 1,
+                        "from": "app",
+                        "to": "clojure.string",
+                        "alias": "str",
+                    }
+                ]
+            }
+        )
+
+        def completions(token, prefix):
+            return [
+                (item.trigger, item.completion)
+                for item in pep.completions(
+                    self.view,
+                    view_analysis_,
+                    self.project_path,
+                    0,
+                    token,
+                    prefix,
+                )
+            ]
+
+        # Alias is resolved to its namespace; only the word after the slash is replaced.
+        self.assertEqual([("str/join", "join")], completions("str/jo", "jo"))
+
+        self.assertEqual(
+            [("str/blank?", "blank?"), ("str/join", "join")],
+            completions("str/", ""),
+        )
+
+        self.assertEqual([("str", "str")], completions("st", "st"))
+
+        self.assertEqual([(":app/db", "db")], completions(":app/d", "d"))
+
+        self.assertEqual([], completions("set/jo", "jo"))
+
+
+class TestDocIndex(TestCase):
+    def test_search(self):
+        index = pep.DocIndex()
+
+        index.update(
+            "-",
+            [
+                {
+                    "filename": "-",
+                    "row": 1,
+                    "col": 1,
+                    "ns": "clojure.core",
+                    "name": "map",
+                    "arglist-strs": ["[f coll]"],
+                    "doc": "Returns a lazy sequence consisting of the result of applying f.",
+                },
+                {
+                    "filename": "-",
+                    "row": 2,
+                    "col": 1,
+                    "ns": "clojure.core",
+                    "name": "lazy-seq",
+                    "doc": "Takes a body of expressions that returns an ISeq or nil.",
+                },
+            ],
+        )
+
+        self.assertEqual(
+            ["map"],
+            [definition["name"] for _, definition in index.search("Lazy sequence")],
+        )
+
+        # Definitions with query terms in their name rank first.
+        self.assertEqual(
+            ["lazy-seq", "map"],
+            [definition["name"] for _, definition in index.search("lazy returns")],
+        )
+
+        self.assertEqual([], index.search(""))
+
+        self.assertEqual(
+            {"->>", "x", "some->", "some", "valid?"},
+            pep.doc_terms("(->> x) 'some->' valid?"),
+        )
+
+        index.update(
+            "-",
+            [
+                {
+                    "filename": "-",
+                    "row": 3,
+                    "col": 1,
+                    "ns": "clojure.core",
+                    "name": "->>",
+                    "doc": "Threads the expr through the forms.",
+                },
+            ],
+        )
+
+        self.assertEqual(
+            ["->>"],
+            [definition["name"] for _, definition in index.search("->>")],
+        )
+
+        index.update("-", [])
+
+        self.assertEqual([], index.search("lazy"))
+        self.assertEqual({}, index.postings)
+
+
+class TestLocalScopeIndex(TestCase):
+    def test_visible_locals(self):
+        # (defn f [x]
+        #   (let [a 1]
+        #     a)
+        #   x)
+        analysis = pep.local_index(
+            {
+                "locals": [
+                    {
+                        "id": 1,
+                        "name": "x",
+                        "row": 1,
+                        "col": 10,
+                        "end-row": 1,
+                        "end-col": 11,
+                        "scope-end-row": 4,
+                        "scope-end-col": 5,
+                    },
+                    {
+                        "id": 2,
+                        "name": "a",
+                        "row": 2,
+                        "col": 9,
+                        "end-row": 2,
+                        "end-col": 10,
+                        "scope-end-row": 3,
+                        "scope-end-col": 7,
+                    },
+                ]
+            }
+        )
+
+        def visible(row, col):
+            return [
+                local_binding["name"]
+                for local_binding in pep.visible_locals(analysis, row, col)
+            ]
+
+        self.assertEqual([], visible(1, 1))
+        self.assertEqual(["x"], visible(2, 3))
+        self.assertEqual(["a", "x"], visible(3, 5))
+        self.assertEqual(["x"], visible(4, 3))
+        self.assertEqual([], visible(5, 1))
+
+
+class TestAnalysisDelay(TestCase):
+    def test_estimate_analysis_delay(self):
+        # Delay is used until there's a latency.
+        self.assertEqual(0.6, pep.estimate_analysis_delay(0.6, 0.1, 2.0))
+
+        latency = {"seconds": 0.02, "size": 1000}
+
+        self.assertEqual(0.1, pep.estimate_analysis_delay(0.6, 0.1, 2.0, latency, 1000))
+
+        latency = {"seconds": 0.4, "size": 1000}
+
+        self.assertAlmostEqual(
+            0.8, pep.estimate_analysis_delay(0.6, 0.1, 2.0, latency, 1000)
+        )
+
+        # Buffer has grown since latency was measured.
+        self.assertAlmostEqual(
+            1.6, pep.estimate_analysis_delay(0.6, 0.1, 2.0, latency, 2000)
+        )
+
+        # Backed off while typing.
+        self.assertAlmostEqual(
+            1.6,
+            pep.estimate_analysis_delay(
+                0.6, 0.1, 2.0, latency, 1000, typing_seconds=10
+            ),
+        )
+
+        # Within max.
+        self.assertEqual(
+            2.0, pep.estimate_analysis_delay(0.6, 0.1, 2.0, latency, 4000)
+        )
+
+
+class TestAnalysisProfile(TestCase):
+    def test_analysis_profile(self):
+        self.assertEqual("full", pep.analysis_profile(10, False, 100, 1000))
+        self.assertEqual("definitions", pep.analysis_profile(100, False, 100, 1000))
+        self.assertEqual("findings", pep.analysis_profile(100, True, 100, 1000))
+        self.assertEqual("findings", pep.analysis_profile(1000, False, 100, 1000))
+
+
+class TestDefinitionIndex(TestCase):
+    def test_update(self):
+        index = pep.DefinitionIndex()
+
+        analysis = {
+            "var-definitions": [
+                {"filename": "a.clj", "ns": "a", "name": "f", "row": 1, "col": 1}
+            ]
+        }
+
+        index.update("a.clj", analysis)
+
+        version = index.version
+
+        # Version doesn't change if definitions didn't change.
+        index.update("a.clj", analysis)
+
+        self.assertEqual(version, index.version)
+
+        self.assertEqual(["f"], [d["name"] for d in index.analysis["vindex"][("a", "f")]])
+
+        index.update(
+            "a.clj",
+            {
+                "var-definitions": [
+                    {"filename": "a.clj", "ns": "a", "name": "g", "row": 1, "col": 1}
+                ]
+            },
+        )
+
+        self.assertEqual([("a", "g")], list(index.analysis["vindex"]))
+
+
+class TestCallGraph(TestCase):
+    def var_usage(self, filename, from_, from_var, to, name, row=1):
+        return {
+            "filename": filename,
+            "row": row,
+            "col": 1,
+            "from": from_,
+            "from-var": from_var,
+            "to": to,
+            "name": name,
+        }
+
+    def test_callers_callees(self):
+        graph = pep.CallGraph()
+
+        # a/f -> b/g -> c/h -> a/f
+        graph.update(
+            "a.clj",
+            [
+                self.var_usage("a.clj", "a", "f", "b", "g", row=1),
+                self.var_usage("a.clj", "a", "f", "b", "g", row=2),
+                # Usages outside of a Var definition aren't edges.
+                {
+                    "filename": "a.clj",
+                    "row": 3,
+                    "col": 1,
+                    "from": "a",
+                    "to": "c",
+                    "name": "h",
+                },
+            ],
+        )
+        graph.update("b.clj", [self.var_usage("b.clj", "b", "g", "c", "h")])
+        graph.update("c.clj", [self.var_usage("c.clj", "c", "h", "a", "f")])
+
+        self.assertEqual([("b", "g")], list(graph.adjacent(("a", "f"), "callees")))
+        self.assertEqual(2, len(graph.adjacent(("a", "f"), "callees")[("b", "g")]))
+
+        self.assertEqual([("c", "h")], list(graph.adjacent(("a", "f"), "callers")))
+
+        # A cycle is walked once.
+        self.assertEqual(
+            [(1, ("b", "g")), (2, ("c", "h")), (3, ("a", "f"))],
+            [
+                (level, var)
+                for level, var, _ in graph.hierarchy(("a", "f"), "callees", 5)
+            ],
+        )
+
+        self.assertEqual(
+            [(1, ("c", "h"))],
+            [
+                (level, var)
+                for level, var, _ in graph.hierarchy(("a", "f"), "callers", 1)
+            ],
+        )
+
+        # Edges are replaced by file.
+        graph.update("b.clj", [])
+
+        self.assertEqual({}, graph.adjacent(("b", "g"), "callees"))
+        self.assertEqual({}, graph.adjacent(("c", "h"), "callers"))
+
+
+class TestNamespaceGraph(TestCase):
+    def test_closure_topological_order(self):
+        graph = pep.NamespaceGraph()
+
+        # a -> b -> c; x <-> y
+        graph.update("a.clj", [{"from": "a", "to": "b"}])
+        graph.update("b.clj", [{"from": "b", "to": "c"}])
+        graph.update("x.clj", [{"from": "x", "to": "y"}])
+        graph.update("y.clj", [{"from": "y", "to": "x"}])
+
+        self.assertEqual({"b": 1, "c": 2}, graph.closure(["a"], "dependencies"))
+        self.assertEqual({"b": 1, "a": 2}, graph.closure(["c"], "dependents"))
+        self.assertEqual({"y": 1}, graph.closure(["x"], "dependents"))
+
+        self.assertEqual({"b.clj"}, graph.dependent_files("c"))
+
+        # Namespaces in a cycle come last.
+        self.assertEqual(["c", "b", "a", "x", "y"], graph.topological_order())
+
+        # Edges are replaced by file.
+        graph.update("b.clj", [])
+
+        self.assertEqual({"b": 1}, graph.closure(["a"], "dependencies"))
+        self.assertEqual(set(), graph.dependent_files("c"))
+        self.assertEqual(["b", "a", "x", "y"], graph.topological_order())
+
+
+class TestAffectedTestNamespaces(TestCase):
+    def setUp(self):
+        self.project_path = "/pep-test-affected-tests"
+
+    def tearDown(self):
+        pep.clear_project_index(self.project_path)
+
+    def analysis(self, namespace, requires):
+        return {
+            "namespace-definitions": [{"name": namespace}],
+            "namespace-usages": [
+                {"from": namespace, "to": required} for required in requires
+            ],
+        }
+
+    def test_affected_test_namespaces(self):
+        pep.update_project_index(
+            self.project_path,
+            {
+                "/src/app/db.clj": self.analysis("app.db", []),
+                "/src/app/core.clj": self.analysis("app.core", ["app.db"]),
+                "/src/app/web.clj": self.analysis("app.web", []),
+                "/test/app/core_test.clj": self.analysis("app.core-test", ["app.core"]),
+                "/test/app/web_test.clj": self.analysis("app.web-test", ["app.web"]),
+            },
+        )
+
+        self.assertEqual(
+            ["app.core-test"],
+            pep.affected_test_namespaces(self.project_path, ["/src/app/db.clj"]),
+        )
+
+        # A changed test namespace is affected too.
+        self.assertEqual(
+            ["app.core-test", "app.web-test"],
+            pep.affected_test_namespaces(
+                self.project_path,
+                ["/src/app/core.clj", "/test/app/web_test.clj"],
+            ),
+        )
+
+        self.assertEqual(
+            [],
+            pep.affected_test_namespaces(self.project_path, ["/src/app/unknown.clj"]),
+        )
+
+
+class TestUsageCountIndex(TestCase):
+    def var_definition(self, name, row, **kwargs):
+        return {
+            "filename": "/src/app/core.clj",
+            "row": row,
+            "col": 1,
+            "ns": "app.core",
+            "name": name,
+            **kwargs,
+        }
+
+    def test_unused(self):
+        index = pep.UsageCountIndex()
+
+        index.update(
+            "/src/app/core.clj",
+            {
+                "var-definitions": [
+                    self.var_definition("used", 1),
+                    self.var_definition("unused", 2),
+                    self.var_definition("recursive", 3),
+                    self.var_definition("quoted", 4),
+                    self.var_definition("private", 5, private=True),
+                    self.var_definition("-main", 6),
+                    self.var_definition(
+                        "a-test", 7, test=True, **{"defined-by": "clojure.test/deftest"}
+                    ),
+                ],
+                "var-usages": [
+                    {
+                        "from": "app.core",
+                        "from-var": "recursive",
+                        "to": "app.core",
+                        "name": "recursive",
+                    },
+                ],
+            },
+        )
+
+        index.update(
+            "/src/app/web.clj",
+            {
+                "var-usages": [
+                    {
+                        "from": "app.web",
+                        "from-var": "handler",
+                        "to": "app.core",
+                        "name": "used",
+                    },
+                ],
+                "symbols": [{"symbol": "app.core/quoted"}],
+            },
+        )
+
+        self.assertEqual(1, index.count("app.core", "used"))
+        self.assertEqual(0, index.count("app.core", "recursive"))
+
+        self.assertEqual(
+            ["unused", "recursive"],
+            [var_definition["name"] for var_definition in index.unused()],
+        )
+
+        # Counts are replaced by file.
+        index.update("/src/app/web.clj", {})
+
+        self.assertEqual(
+            ["used", "unused", "recursive", "quoted"],
+            [var_definition["name"] for var_definition in index.unused()],
+        )
+
+
+class TestLintBatches(TestCase):
+    def test_lint_batches(self):
+        self.assertEqual([], pep.lint_batches([], 7))
+
+        # "aaa:bbb" is 7 characters long.
+        self.assertEqual(
+            [["aaa", "bbb"], ["cc", "d"]],
+            pep.lint_batches(["aaa", "bbb", "cc", "d"], 7),
+        )
+
+        # A filename longer than max length is a batch of its own.
+        self.assertEqual(
+            [["a"], ["abcdefgh"], ["b"]],
+            pep.lint_batches(["a", "abcdefgh", "b"], 7),
+        )